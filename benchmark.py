@@ -0,0 +1,457 @@
+"""Import throughput benchmark.
+
+    python benchmark.py generate [--sizes 10000,100000,1000000] [--out bench_data]
+    python benchmark.py import [--sizes ...] [--modes bulk,batch] [--out bench_data]
+    python benchmark.py reports [--sizes 50000] [--repeat 3] [--baseline 1] [--out bench_data]
+    python benchmark.py profiles [--sizes 10000] [--modes row,bulk] [--repeat 3] [--out bench_data]
+    python benchmark.py startup [--repeat 5] [--budget 150] [--top 10]
+
+`generate` writes synthetic statements in the import_expenses_template.csv format.
+`import` loads each of them into a fresh database built from the version 0 ExpenseReport
+schema plus the migrations and reports rows/sec, total time and peak RSS. Every import runs in its own
+process so peak RSS belongs to that run alone.
+`reports` loads a statement into a database at the latest schema, drops the indexes
+added after schema --baseline (by default the secondary indexes and everything after),
+times the SQL behind every report and list_expenses, recreates the indexes and times
+them again. The tables stay at the latest schema because the importer and the reports
+need them.
+`profiles` repeats an import and the report timings under each SQLite performance
+profile.
+`startup` imports the CLI in a fresh interpreter with -X importtime, prints the
+slowest modules and exits non-zero when the import takes longer than --budget ms.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+
+from csv_operations import EXPECTED_HEADER
+from filters import parse_filters
+from migrations import run_migrations
+from sqlite_profile import PROFILES, apply_profile
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+DEFAULT_MODES = ["bulk", "batch"]
+# The ExpenseReport tables as they are before any migration. The tracked database can't be
+# copied for this: main.py migrates it in place, and its tables then carry the added columns.
+BASE_SCHEMA = [
+    "CREATE TABLE Role (role_id INTEGER PRIMARY KEY, role_name TEXT NOT NULL UNIQUE)",
+    "CREATE TABLE User (username TEXT PRIMARY KEY, password TEXT NOT NULL)",
+    "CREATE TABLE Expense (expense_id INTEGER PRIMARY KEY, date TEXT NOT NULL, amount REAL NOT NULL, description TEXT)",
+    "CREATE TABLE Categories (category_id INTEGER PRIMARY KEY, category_name TEXT NOT NULL UNIQUE)",
+    "CREATE TABLE Tags (tag_id INTEGER PRIMARY KEY, tag_name TEXT NOT NULL UNIQUE)",
+    "CREATE TABLE Payment_Method (payment_method_id INTEGER PRIMARY KEY, payment_method_name TEXT NOT NULL UNIQUE)",
+    """CREATE TABLE user_expense (
+        username TEXT NOT NULL, expense_id INTEGER NOT NULL,
+        PRIMARY KEY (username, expense_id),
+        FOREIGN KEY (username) REFERENCES User(username) ON DELETE CASCADE,
+        FOREIGN KEY (expense_id) REFERENCES Expense(expense_id) ON DELETE CASCADE)""",
+    """CREATE TABLE user_role (
+        username TEXT NOT NULL, role_id INTEGER NOT NULL,
+        PRIMARY KEY (username, role_id),
+        FOREIGN KEY (username) REFERENCES User(username) ON DELETE CASCADE,
+        FOREIGN KEY (role_id) REFERENCES Role(role_id) ON DELETE CASCADE)""",
+    """CREATE TABLE category_expense (
+        category_id INTEGER NOT NULL, expense_id INTEGER NOT NULL,
+        PRIMARY KEY (category_id, expense_id),
+        FOREIGN KEY (category_id) REFERENCES Categories(category_id) ON DELETE CASCADE,
+        FOREIGN KEY (expense_id) REFERENCES Expense(expense_id) ON DELETE CASCADE)""",
+    """CREATE TABLE tag_expense (
+        tag_id INTEGER NOT NULL, expense_id INTEGER NOT NULL,
+        PRIMARY KEY (tag_id, expense_id),
+        FOREIGN KEY (tag_id) REFERENCES Tags(tag_id) ON DELETE CASCADE,
+        FOREIGN KEY (expense_id) REFERENCES Expense(expense_id) ON DELETE CASCADE)""",
+    """CREATE TABLE payment_method_expense (
+        payment_method_id INTEGER NOT NULL, expense_id INTEGER NOT NULL, payment_detail_identifier TEXT NULL,
+        PRIMARY KEY (payment_method_id, expense_id),
+        FOREIGN KEY (payment_method_id) REFERENCES Payment_Method(payment_method_id) ON DELETE CASCADE,
+        FOREIGN KEY (expense_id) REFERENCES Expense(expense_id) ON DELETE CASCADE)"""
+]
+STARTUP_MODULE = "main"
+STARTUP_BUDGET_MS = 150
+HEAVY_MODULES = ["numpy", "matplotlib"]  # should only be imported by the first report that draws a chart
+BENCH_USER = "bench"
+BASELINE_SCHEMA = 1  # indexes as of the content hash index, before the secondary indexes
+
+# Cardinalities roughly match a household's statement: a handful of categories and
+# payment methods, a few hundred free-text tags with a long tail, a few cards.
+CATEGORIES = ["food", "groceries", "transportation", "utilities", "movies",
+              "rent", "health", "shopping", "travel", "education"]
+PAYMENT_METHODS = ["cash", "upi", "credit card", "debit card"]
+TAGS = [f"tag{i:03d}" for i in range(300)]
+TAG_WEIGHTS = [1 / (rank + 1) for rank in range(len(TAGS))]
+MERCHANTS = ["corner cafe", "city mart", "metro rail", "power co", "cineplex", "landlord",
+             "pharmacy", "online store", "airline", "bookshop", "bakery", "fuel station"]
+CARDS = ["4111111111111111", "5500005555555559", "340000000000009", "6011000000000004"]
+
+
+def generate_statement(path, rows, seed=0):
+    """Write `rows` synthetic expenses to `path`"""
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPECTED_HEADER)
+        for i in range(rows):
+            payment_method = rng.choice(PAYMENT_METHODS)
+            writer.writerow([
+                f"{rng.lognormvariate(3.5, 1.0):.2f}",
+                rng.choice(CATEGORIES),
+                payment_method,
+                f"{rng.randint(2022, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                f"{rng.choice(MERCHANTS)} #{i}",
+                rng.choices(TAGS, TAG_WEIGHTS)[0],
+                rng.choice(CARDS) if payment_method.endswith("card") else ""
+            ])
+
+
+def statement_path(out_dir, rows):
+    return os.path.join(out_dir, f"statement_{rows}.csv")
+
+
+def create_database(path, schema_version=None):
+    """Create an empty database with the ExpenseReport schema and the benchmark's reference data.
+
+    BASE_SCHEMA is migrated to `schema_version`, by default the latest one.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    for sql in BASE_SCHEMA:
+        cursor.execute(sql)
+    run_migrations(cursor, conn, schema_version)
+
+    cursor.execute("INSERT INTO Role (role_id, role_name) VALUES (1, 'admin'), (2, 'user')")
+    cursor.execute("INSERT INTO User (username, password) VALUES (?, ?)", (BENCH_USER, BENCH_USER))
+    cursor.execute("INSERT INTO user_role (username, role_id) VALUES (?, 2)", (BENCH_USER,))
+    cursor.executemany("INSERT INTO Categories (category_name) VALUES (?)", [(name,) for name in CATEGORIES])
+    cursor.executemany("INSERT INTO Payment_Method (payment_method_name) VALUES (?)", [(name,) for name in PAYMENT_METHODS])
+    conn.commit()
+    conn.close()
+
+
+def import_once(db_path, csv_path, mode, profile=None):
+    """Import one file in this process and return its measurements"""
+    from csv_operations import CSVOperations
+    from expense import ExpenseManager
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    if profile:
+        apply_profile(cursor, profile)
+    expense_manager = ExpenseManager(cursor, conn)
+    csv_operations = CSVOperations(cursor, conn, expense_manager)
+    csv_operations.set_current_user(BENCH_USER)
+
+    options = {"row": {}, "bulk": {"bulk": True}, "batch": {"batch_size": 5000},
+               "workers": {"workers": os.cpu_count() or 1}}[mode]
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        csv_operations.import_expenses(csv_path, **options)
+    elapsed = time.perf_counter() - start
+
+    cursor.execute("SELECT COUNT(*) FROM Expense")
+    imported = cursor.fetchone()[0]
+    conn.close()
+    if not imported:
+        raise RuntimeError(f"No rows were imported from {csv_path}: {output.getvalue().strip()}")
+    return {
+        "rows": imported,
+        "seconds": elapsed,
+        "rows_per_sec": imported / elapsed if elapsed else 0.0,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "summary": output.getvalue().strip().splitlines()[-1:]
+    }
+
+
+class TimedCursor:
+    """Cursor wrapper that adds up the time spent executing statements and fetching rows"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.seconds = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def execute(self, *args):
+        self._timed(self.cursor.execute, *args)
+        return self
+
+    def fetchone(self):
+        return self._timed(self.cursor.fetchone)
+
+    def fetchall(self):
+        return self._timed(self.cursor.fetchall)
+
+    def fetchmany(self, *args):
+        return self._timed(self.cursor.fetchmany, *args)
+
+
+REPORTS = {
+    "list_expenses": lambda reports, expenses: expenses.list_expenses(user_role=reports.privileges),
+    "list_expenses month=march": lambda reports, expenses: expenses.list_expenses(parse_filters("month=march"), reports.privileges),
+    "top_expenses": lambda reports, expenses: reports.generate_report_top_expenses(10, "2023-01-01", "2023-03-31"),
+    "category_spending": lambda reports, expenses: reports.generate_report_category_spending("food"),
+    "above_average_expenses": lambda reports, expenses: reports.generate_report_above_average_expenses(),
+    "monthly_category_spending": lambda reports, expenses: reports.generate_report_monthly_category_spending(),
+    "highest_spender_per_month": lambda reports, expenses: reports.generate_report_highest_spender_per_month(),
+    "frequent_category": lambda reports, expenses: reports.generate_report_frequent_category(),
+    "payment_method_usage": lambda reports, expenses: reports.generate_report_payment_method_usage(),
+    "tag_expenses": lambda reports, expenses: reports.generate_report_tag_expenses(),
+    "payment_method_details_expense": lambda reports, expenses: reports.generate_report_payment_method_details_expense(),
+    "analyze_expenses": lambda reports, expenses: reports.generate_expenses_analytics()
+}
+ADMIN_ONLY_REPORTS = {"highest_spender_per_month"}
+ROLES = ["user", "admin"]
+
+
+def time_reports(db_path, repeat, profile=None):
+    """Best-of-`repeat` seconds spent in SQL by each report, keyed by (report, role).
+
+    Reports run as BENCH_USER, once with each role; regular users only see their own rows.
+    """
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    conn = sqlite3.connect(db_path)
+    if profile:
+        apply_profile(conn.cursor(), profile)
+    timings = {}
+    for name, report in REPORTS.items():
+        for role in ROLES:
+            if role != "admin" and name in ADMIN_ONLY_REPORTS:
+                continue
+            timings[name, role] = _best_time(conn, report, role, repeat)
+    conn.close()
+    return timings
+
+
+def _best_time(conn, report, role, repeat):
+    import matplotlib.pyplot as plt
+    from expense import ExpenseManager
+    from reporting import ReportManager
+
+    best = None
+    for _ in range(repeat):
+        cursor = TimedCursor(conn.cursor())
+        expense_manager = ExpenseManager(cursor, conn)
+        expense_manager.set_current_user(BENCH_USER)
+        report_manager = ReportManager(cursor, conn)
+        report_manager.set_user_info(BENCH_USER, role)
+        with contextlib.redirect_stdout(io.StringIO()):
+            report(report_manager, expense_manager)
+        plt.close("all")
+        best = cursor.seconds if best is None else min(best, cursor.seconds)
+    return best
+
+
+def indexes_added_after(version):
+    """{name: sql} of the indexes created by the migrations after `version`"""
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    for sql in BASE_SCHEMA:
+        cursor.execute(sql)
+    index_sql = "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+    run_migrations(cursor, conn, version)
+    existing = dict(cursor.execute(index_sql).fetchall())
+    latest = run_migrations(cursor, conn)
+    added = {name: sql for name, sql in cursor.execute(index_sql).fetchall() if name not in existing}
+    conn.close()
+    return added, latest
+
+
+def _set_indexes(db_path, indexes, present):
+    """Create or drop `indexes` ({name: sql}) and refresh the planner statistics"""
+    conn = sqlite3.connect(db_path)
+    for name, sql in indexes.items():
+        conn.execute(sql if present else f"DROP INDEX {name}")
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+
+def run_reports(out_dir, sizes, repeat, baseline=BASELINE_SCHEMA):
+    """Time the reports with only the indexes of schema `baseline`, then with all of them"""
+    added, latest = indexes_added_after(baseline)
+    for rows in sizes:
+        csv_path = statement_path(out_dir, rows)
+        if not os.path.exists(csv_path):
+            generate_statement(csv_path, rows)
+        db_path = os.path.join(out_dir, f"bench_{rows}_reports.db")
+        create_database(db_path)
+        import_once(db_path, csv_path, "bulk")
+
+        _set_indexes(db_path, added, present=False)
+        before = time_reports(db_path, repeat)
+        _set_indexes(db_path, added, present=True)
+        after = time_reports(db_path, repeat)
+
+        print(f"{rows} rows, SQL seconds (best of {repeat}), indexes of schema {baseline} -> {latest}")
+        print(f"{'Report':<32} {'Role':<6} {'Before':>10} {'After':>10} {'Speedup':>9}")
+        print("-" * 71)
+        for name, role in before:
+            speedup = before[name, role] / after[name, role] if after[name, role] else float("inf")
+            print(f"{name:<32} {role:<6} {before[name, role]:>10.3f} {after[name, role]:>10.3f} {speedup:>8.1f}x")
+        os.remove(db_path)
+
+
+def _import_in_child(db_path, csv_path, mode, profile=None):
+    child = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "_import_once", db_path, csv_path, mode] + ([profile] if profile else []),
+        capture_output=True, text=True)
+    if child.returncode != 0:
+        raise RuntimeError(f"{mode} import of {csv_path} failed: {child.stderr.strip().splitlines()[-1:]}")
+    return json.loads(child.stdout)
+
+
+def _remove_database(db_path):
+    for path in (db_path, db_path + "-wal", db_path + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def run_profiles(out_dir, sizes, modes, repeat):
+    """Import each statement and time the reports under every profile in PROFILES"""
+    for rows in sizes:
+        csv_path = statement_path(out_dir, rows)
+        if not os.path.exists(csv_path):
+            generate_statement(csv_path, rows)
+
+        print(f"{rows} rows, import seconds and report SQL seconds (best of {repeat}, summed over all reports)")
+        print(f"{'Profile':<10} " + " ".join(f"{mode + ' import':>13} {'rows/sec':>10}" for mode in modes) + f" {'Reports':>9}")
+        print("-" * (11 + 25 * len(modes) + 10))
+        for profile in PROFILES:
+            line = f"{profile:<10} "
+            for mode in modes:
+                db_path = os.path.join(out_dir, f"bench_{rows}_{profile}_{mode}.db")
+                create_database(db_path)
+                result = _import_in_child(db_path, csv_path, mode, profile)
+                line += f"{result['seconds']:>13.2f} {result['rows_per_sec']:>10.0f} "
+                if mode != modes[-1]:
+                    _remove_database(db_path)
+            reports = time_reports(db_path, repeat, profile)
+            _remove_database(db_path)
+            print(line + f"{sum(reports.values()):>9.3f}")
+        print()
+
+
+def run_import(out_dir, sizes, modes):
+    print(f"{'Rows':>10} {'Mode':<8} {'Seconds':>10} {'Rows/sec':>12} {'Peak RSS MB':>12}")
+    print("-" * 56)
+    for rows in sizes:
+        csv_path = statement_path(out_dir, rows)
+        if not os.path.exists(csv_path):
+            generate_statement(csv_path, rows)
+        for mode in modes:
+            db_path = os.path.join(out_dir, f"bench_{rows}_{mode}.db")
+            create_database(db_path)
+            result = _import_in_child(db_path, csv_path, mode)
+            print(f"{rows:>10} {mode:<8} {result['seconds']:>10.2f} {result['rows_per_sec']:>12.0f} {result['peak_rss_mb']:>12.1f}")
+            os.remove(db_path)
+
+
+def measure_startup(module=STARTUP_MODULE):
+    """Import module in a fresh interpreter; returns {name: (self_us, cumulative_us)} from -X importtime"""
+    child = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+    times = {}
+    for line in child.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def run_startup(repeat, budget_ms, top):
+    """Time the CLI's imports (best of repeat) against budget_ms; returns True when within budget"""
+    times = min((measure_startup() for _ in range(repeat)), key=lambda run: run[STARTUP_MODULE][1])
+    total_ms = times[STARTUP_MODULE][1] / 1000
+
+    print(f"Slowest modules by self time (best of {repeat})")
+    print(f"{'Module':<40} {'Self ms':>10} {'Cumulative ms':>14}")
+    print("-" * 66)
+    for name, (self_us, cumulative_us) in sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:top]:
+        print(f"{name:<40} {self_us / 1000:>10.1f} {cumulative_us / 1000:>14.1f}")
+    print("-" * 66)
+    loaded = [name for name in HEAVY_MODULES if name in times]
+    print(f"Heavy modules imported at startup: {', '.join(loaded) if loaded else 'none'}")
+    within = total_ms <= budget_ms
+    print(f"import {STARTUP_MODULE}: {total_ms:.1f} ms, budget {budget_ms:.0f} ms: {'OK' if within else 'OVER BUDGET'}")
+    return within
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expense import benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="write synthetic statements")
+    run = commands.add_parser("import", help="time imports of the synthetic statements")
+    for command in (generate, run):
+        command.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES))
+        command.add_argument("--out", default="bench_data")
+    run.add_argument("--modes", default=",".join(DEFAULT_MODES), help="any of row, bulk, batch, workers")
+    reports = commands.add_parser("reports", help="time the report queries before and after the schema migrations")
+    reports.add_argument("--sizes", default="50000")
+    reports.add_argument("--out", default="bench_data")
+    reports.add_argument("--repeat", type=int, default=3)
+    reports.add_argument("--baseline", type=int, default=BASELINE_SCHEMA, help="time first with only this schema version's indexes")
+
+    profiles = commands.add_parser("profiles", help="time an import and the reports under each SQLite performance profile")
+    profiles.add_argument("--sizes", default="10000")
+    profiles.add_argument("--out", default="bench_data")
+    profiles.add_argument("--modes", default="row,bulk", help="import modes to time, as for import")
+    profiles.add_argument("--repeat", type=int, default=3)
+
+    startup = commands.add_parser("startup", help="time the CLI's module imports against a startup budget")
+    startup.add_argument("--repeat", type=int, default=5)
+    startup.add_argument("--budget", type=float, default=STARTUP_BUDGET_MS, help="milliseconds allowed for import main")
+    startup.add_argument("--top", type=int, default=10, help="number of slowest modules to list")
+
+    once = commands.add_parser("_import_once")
+    once.add_argument("db_path")
+    once.add_argument("csv_path")
+    once.add_argument("mode")
+    once.add_argument("profile", nargs="?")
+
+    args = parser.parse_args()
+    if args.command == "_import_once":
+        print(json.dumps(import_once(args.db_path, args.csv_path, args.mode, args.profile)))
+        return
+    if args.command == "startup":
+        sys.exit(0 if run_startup(args.repeat, args.budget, args.top) else 1)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    os.makedirs(args.out, exist_ok=True)
+    if args.command == "generate":
+        for rows in sizes:
+            generate_statement(statement_path(args.out, rows), rows)
+            print(f"Wrote {statement_path(args.out, rows)}")
+    elif args.command == "reports":
+        run_reports(args.out, sizes, args.repeat, args.baseline)
+    elif args.command == "profiles":
+        run_profiles(args.out, sizes, args.modes.split(","), args.repeat)
+    else:
+        run_import(args.out, sizes, args.modes.split(","))
+
+
+if __name__ == "__main__":
+    main()
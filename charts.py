@@ -0,0 +1,68 @@
+import itertools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CHART_FORMATS = ["png", "svg"]
+CHART_DIR_ENV = "EXPENSE_CHART_DIR"
+
+
+class ChartRenderer:
+    """Draws report charts, either in a window or to files.
+
+    Without a chart_dir each chart is shown in a non-blocking window as it is drawn.
+    With one, pyplot switches to the Agg backend and charts are drawn and saved as
+    PNG or SVG by a single worker thread, so a report's table comes back straight away.
+    Only that thread touches pyplot in file mode, which is what keeps it safe.
+    pyplot is imported on first use rather than at startup; in file mode the worker
+    imports it and switches backends as soon as it starts.
+    """
+
+    def __init__(self, chart_dir=None, chart_format="png"):
+        self.chart_dir = chart_dir
+        self.chart_format = chart_format
+        self.executor = None
+        self.sequence = itertools.count(1)
+        if chart_dir is not None:
+            os.makedirs(chart_dir, exist_ok=True)
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart")
+            self.executor.submit(self._use_agg)
+
+    def render(self, name, plot, *args):
+        """Call plot(*args) to draw a figure and show or save it; returns a future in file mode"""
+        if self.executor is None:
+            import matplotlib.pyplot as plt
+            plot(*args)
+            plt.show(block=False)  # Non-blocking display
+            plt.pause(0.001)  # Small pause to render the plot
+            return None
+
+        file_name = f"{name}_{time.strftime('%Y%m%d_%H%M%S')}_{next(self.sequence)}.{self.chart_format}"
+        path = os.path.join(self.chart_dir, file_name)
+        future = self.executor.submit(self._save, plot, args, path)
+        future.add_done_callback(lambda done: self._report_failure(path, done))
+        print(f"Chart will be written to {path}")
+        return future
+
+    @staticmethod
+    def _use_agg():
+        import matplotlib.pyplot as plt
+        plt.switch_backend("Agg")
+
+    def _save(self, plot, args, path):
+        import matplotlib.pyplot as plt
+        try:
+            plot(*args)
+            plt.savefig(path, format=self.chart_format, bbox_inches="tight")
+        finally:
+            plt.close("all")
+        return path
+
+    def _report_failure(self, path, future):
+        if future.exception() is not None:
+            print(f"\nError rendering chart {path}: {future.exception()}")
+
+    def close(self):
+        """Wait for charts still being drawn"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
@@ -8,17 +8,21 @@ list_of_privileges = {
         "list_categories": "list_categories",
         "add_category": "add_category <category_name>",
         "list_users": "list_users",
-        "list_expenses": "list_expenses [<field> <operator> <value>, ...]",
+        "backfill_hashes": "backfill_hashes",
+        "list_expenses": "list_expenses [<field> <operator> <value>, ...] [--limit <N>] [--order id|date] [--after <expense_id>|<date>,<expense_id>] [--count]",
+        "cache": "cache refresh|stats",
+        "explain": "explain <command>",
+        "pragmas": "pragmas",
         "report": {
             "top_expenses": "report top_expenses <N> <start_date> <end_date>",
             "category_spending": "report category_spending <category>",
-            "above_average_expenses": "report above_average_expenses",
+            "above_average_expenses": "report above_average_expenses [--top <K>]",
             "monthly_category_spending": "report monthly_category_spending",
             "highest_spender_per_month": "report highest_spender_per_month",
             "frequent_category": "report frequent_category",
             "tag_expenses": "report tag_expenses",
             "payment_method_usage": "report payment_method_usage",
-            "analyze_expenses": "report analyze_expenses [<field> <operator> <value>, ...]"
+            "analyze_expenses": "report analyze_expenses [--sql] [<field> <operator> <value>, ...]"
         }
     },
     "user": {
@@ -27,19 +31,22 @@ list_of_privileges = {
         "add_expense": "add_expense <amount> <category> <payment_method> <date> <description> <tag>",
         "update_expense": "update_expense <expense_id> <field> <new_value>",
         "delete_expense": "delete_expense <expense_id>",
-        "list_expenses": "list_expenses [<field> <operator> <value>, ...]",
-        "import_expenses": "import_expenses <file_path>",
+        "list_expenses": "list_expenses [<field> <operator> <value>, ...] [--limit <N>] [--order id|date] [--after <expense_id>|<date>,<expense_id>] [--count]",
+        "import_expenses": "import_expenses <file_path> [--bulk] [--batch <rows>] [--workers <n>] [--dry-run] [--format csv|jsonl]",
         "export_csv": "export_csv <file_path> [, sort-on <field_name>]",
+        "cache": "cache refresh|stats",
+        "explain": "explain <command>",
+        "pragmas": "pragmas",
         "report": {
             "top_expenses": "report top_expenses <N> <start_date> <end_date>",
             "category_spending": "report category_spending <category>",
-            "above_average_expenses": "report above_average_expenses",
+            "above_average_expenses": "report above_average_expenses [--top <K>]",
             "monthly_category_spending": "report monthly_category_spending",
             "payment_method_usage": "report payment_method_usage",
             "frequent_category": "report frequent_category",
             "tag_expenses": "report tag_expenses",
             "payment_method_details_expense": "report payment_method_details_expense",
-            "analyze_expenses": "report analyze_expenses [<field> <operator> <value>, ...]"
+            "analyze_expenses": "report analyze_expenses [--sql] [<field> <operator> <value>, ...]"
         }
     }
 }
@@ -1,11 +1,229 @@
+import bz2
+import contextlib
 import csv
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import lzma
+import os
 import sqlite3
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from dimension_cache import DimensionCache
+from expense import begin_write
+from expense_hash import content_hash, expense_key
+from import_progress import ImportProgress
+
+DEFAULT_BATCH_SIZE = 5000
+
+EXPECTED_HEADER = ["amount", "category", "payment_method", "date", "description", "tag", "payment_detail_identifier"]
+
+SOURCE_FORMATS = ["csv", "jsonl"]
+
+# Compressed sources are decompressed while streaming, never to disk
+COMPRESSION_OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+
+def _open_binary(file_path):
+    for extension, opener in COMPRESSION_OPENERS.items():
+        if file_path.lower().endswith(extension):
+            return opener(file_path, "rb")
+    return open(file_path, "rb")
+
+
+def _plain_size(file_path):
+    """Size of the decoded stream if it is the file itself, used for the progress ETA"""
+    if any(file_path.lower().endswith(extension) for extension in COMPRESSION_OPENERS):
+        return None
+    return os.path.getsize(file_path)
+
+
+def _rejects_path(file_path):
+    return file_path + ".rejects.csv"
+
+
+def _source_format(file_path):
+    """Guess csv or jsonl from the file name, ignoring a compression extension"""
+    name = file_path.lower()
+    for extension in COMPRESSION_OPENERS:
+        if name.endswith(extension):
+            name = name[:-len(extension)]
+    return "jsonl" if name.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def _jsonl_rows(lines, first_line):
+    """Turn JSON Lines objects into (line, row) pairs with rows in EXPECTED_HEADER order.
+    
+    Blank lines are skipped but still counted, so line numbers match the file.
+    Lines that are not objects with at least the six required keys become empty
+    rows, which the import rejects as having an incorrect number of fields.
+    """
+    for i, line in enumerate(lines, first_line):
+        if not line.strip():
+            continue
+        try:
+            expense = json.loads(line)
+        except ValueError:
+            yield i, []
+            continue
+        if not isinstance(expense, dict) or any(column not in expense for column in EXPECTED_HEADER[:6]):
+            yield i, []
+            continue
+        yield i, ["" if expense.get(column) is None else str(expense.get(column)) for column in EXPECTED_HEADER]
+
+
+def _number_rows(rows, source_format, first_line):
+    """(line, row) pairs from what _read_rows returned, numbering from first_line"""
+    if source_format == "jsonl":
+        return _jsonl_rows(rows, first_line)
+    return enumerate(rows, first_line)
+
+
+def _read_rows(lines, source_format):
+    """Return (rows, first_line) for the source, or (None, None) after reporting a bad CSV header.
+    
+    For JSON Lines rows are the raw lines; _number_rows parses them.
+    """
+    if source_format == "jsonl":
+        return lines, 1
+    
+    reader = csv.reader(lines)
+    header = next(reader)
+    if [col.strip().lower() for col in header] != EXPECTED_HEADER:
+        print("Error: CSV header does not match expected format.")
+        return None, None
+    return reader, 2  # Start counting from line 2 (after header)
+
+
+def _file_checksum(file_path):
+    """sha256 of the file, read in 1 MB blocks so memory stays flat"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _parse_date(value):
+    """datetime for a YYYY-MM-DD string, or ValueError; unpadded dates such as 2024-1-5 are rejected"""
+    parsed = datetime.strptime(value, "%Y-%m-%d")
+    if parsed.date().isoformat() != value:
+        raise ValueError(f"'{value}' is not in YYYY-MM-DD format")
+    return parsed
+
+
+def parse_import_rows(numbered_rows):
+    """Normalise and validate (line, row) pairs from an import file.
+    
+    Returns (records, errors): records are (line, record) pairs ready for
+    CSVOperations._write_batch, errors are (line, message) pairs. Kept at module
+    level and free of database access so ProcessPoolExecutor workers can run it.
+    """
+    records = []
+    errors = []
+    for i, row in numbered_rows:
+        if len(row) < 6:
+            errors.append((i, "Incorrect number of fields."))
+            continue
+            
+        amount, category, payment_method, date, description, tag = row[:6]
+        payment_detail_identifier = ""
+        if len(row) == 7:
+            payment_detail_identifier = row[6]
+        
+        try:
+            amount = float(amount)
+        except ValueError:
+            errors.append((i, f"Invalid amount '{amount}'. Must be a number."))
+            continue
+        
+        try:
+            parsed_date = _parse_date(date.strip())
+        except ValueError:
+            errors.append((i, f"Invalid date '{date}'. Must be in the format YYYY-MM-DD."))
+            continue
+        
+        key = expense_key(amount, category, payment_method, date, description, tag)
+        _, category_norm, payment_method_norm, _, _, tag_norm = key
+        records.append((i, (content_hash(key), amount, category_norm, payment_method_norm, date, parsed_date.year, parsed_date.month,
+                            description, tag_norm, payment_detail_identifier)))
+    return records, errors
+
+
+def _valid_amounts(amounts):
+    """Boolean mask of the strings in a numpy array that float() accepts"""
+    import numpy as np
+    try:
+        amounts.astype(np.float64)
+        return np.ones(len(amounts), dtype=bool)
+    except ValueError:
+        pass
+    
+    # Some value in the batch is bad; find which ones
+    def is_number(value):
+        try:
+            float(value)
+            return True
+        except ValueError:
+            return False
+    return np.frompyfunc(is_number, 1, 1)(amounts).astype(bool)
+
+
+def _valid_dates(dates):
+    """Boolean mask of the strings in a numpy array that are real YYYY-MM-DD dates, by the import's own rule"""
+    import numpy as np
+    
+    def is_date(value):
+        try:
+            _parse_date(value)
+            return True
+        except ValueError:
+            return False
+    # A statement repeats the same few dates, so each distinct value is checked once
+    values, inverse = np.unique(dates, return_inverse=True)
+    return np.array([is_date(value) for value in values.tolist()], dtype=bool)[inverse.reshape(-1)]
+
+
+class _InlineExecutor:
+    """Stand-in for ProcessPoolExecutor that runs each task immediately in this process"""
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _TrackedLines:
+    """Line iterator over a binary file that remembers the byte offset of the next unread line.
+    
+    csv.reader only pulls lines as it needs them, so after it yields a row `offset`
+    is exactly where the following row starts.
+    """
+    def __init__(self, raw):
+        self.raw = raw
+        self.offset = 0
+    
+    def __iter__(self):
+        for line in self.raw:
+            self.offset += len(line)
+            yield line.decode("utf-8")
+
 
 class CSVOperations:
-    def __init__(self, cursor, conn, expense_manager=None):
+    def __init__(self, cursor, conn, expense_manager=None, dimension_cache=None, report_cache=None):
         self.conn = conn
         self.cursor = cursor
         self.expense_manager = expense_manager
+        self.dimension_cache = dimension_cache or DimensionCache(cursor)
+        self.report_cache = report_cache
         self.current_user = None
     
     def set_current_user(self, username):
@@ -13,84 +231,463 @@ class CSVOperations:
         if self.expense_manager:
             self.expense_manager.set_current_user(username)
     
-    def import_expenses(self, file_path):
+    def import_expenses(self, file_path, bulk=False, batch_size=None, workers=0, dry_run=False, source_format=None):
+        source_format = source_format or _source_format(file_path)
+        if workers and not batch_size:
+            batch_size = DEFAULT_BATCH_SIZE
+        if batch_size and not dry_run:
+            return self._chunked_import(file_path, source_format, batch_size, workers)
+        
         try:
-            with open(file_path, newline="") as csvfile:
-                reader = csv.reader(csvfile)
-                header = next(reader)
-                expected_header = ["amount", "category", "payment_method", "date", "description", "tag", "payment_detail_identifier"]
-                if [col.strip().lower() for col in header] != expected_header:
-                    print("Error: CSV header does not match expected format.")
+            with _open_binary(file_path) as raw:
+                lines = _TrackedLines(raw)
+                rows, first_line = _read_rows(lines, source_format)
+                if rows is None:
                     return False
-                    
-                success_count = 0
-                error_count = 0
-                duplicate_count = 0
+                numbered_rows = _number_rows(rows, source_format, first_line)
                 
-                # Keep track of imported expenses to detect duplicates
-                imported_expenses = set()
+                if dry_run:
+                    return self._dry_run(numbered_rows, batch_size or DEFAULT_BATCH_SIZE)
                 
-                for i, row in enumerate(reader, 2):  # Start counting from line 2 (after header)
-                    if len(row) < 6:
-                        print(f"Skipping row {i}: Incorrect number of fields.")
-                        error_count += 1
-                        continue
-                        
-                    amount, category, payment_method, date, description, tag = row[:6]
-                    payment_detail_identifier = ""
-                    if len(row) == 7:
-                        payment_detail_identifier = row[6]
-                    
-                    # Normalize data for duplicate checking
-                    category_norm = category.strip().lower()
-                    payment_method_norm = payment_method.strip().lower()
-                    tag_norm = tag.strip().lower()
-                    
-                    # Create a unique identifier for this expense
-                    expense_key = (
-                        float(amount), 
-                        category_norm, 
-                        payment_method_norm, 
-                        date.strip(), 
-                        description.strip(), 
-                        tag_norm
-                    )
+                progress = ImportProgress(_rejects_path(file_path), _plain_size(file_path))
+                try:
+                    if bulk:
+                        return self._bulk_import(numbered_rows, lines, progress)
+                    self._row_by_row_import(numbered_rows, lines, progress)
+                finally:
+                    progress.close()
+                
+                progress.summary()
+                return True
+                
+        except FileNotFoundError:
+            print(f"Error: File '{file_path}' not found.")
+            return False
+        except Exception as e:
+            print(f"Error while importing CSV: {e}")
+            return False
+
+    def _row_by_row_import(self, numbered_rows, lines, progress):
+        """Import through addexpense, committing every row"""
+        while True:
+            with progress.phase("parse"):
+                item = next(numbered_rows, None)
+            if item is None:
+                break
+            i, row = item
+            
+            with progress.phase("validate"):
+                if len(row) < 6:
+                    progress.reject(i, "Incorrect number of fields.")
+                    progress.update(1, lines.offset)
+                    continue
                     
-                    # Check if this expense is already in our imported set
-                    if expense_key in imported_expenses:
-                        print(f"Skipping row {i}: Duplicate expense detected.")
-                        duplicate_count += 1
-                        continue
+                amount, category, payment_method, date, description, tag = row[:6]
+                payment_detail_identifier = ""
+                if len(row) == 7:
+                    payment_detail_identifier = row[6]
+                
+                # Normalize data for duplicate checking
+                try:
+                    key = expense_key(amount, category, payment_method, date, description, tag)
+                except ValueError:
+                    progress.reject(i, f"Invalid amount '{amount}'. Must be a number.")
+                    progress.update(1, lines.offset)
+                    continue
+                _, category_norm, payment_method_norm, _, _, tag_norm = key
+                
+                # Same date rule as parse_import_rows, so every mode accepts the same rows
+                try:
+                    _parse_date(date.strip())
+                except ValueError:
+                    progress.reject(i, f"Invalid date '{date}'. Must be in the format YYYY-MM-DD.")
+                    progress.update(1, lines.offset)
+                    continue
+                
+                # Anything imported before, from this file or an earlier one, already carries this hash
+                duplicate = bool(self._existing_hashes([content_hash(key)]))
+            
+            if duplicate:
+                progress.reject(i, "Duplicate expense detected.", duplicate=True)
+                progress.update(1, lines.offset)
+                continue
+            
+            # addexpense reports its errors on stdout; send them to the rejects file instead
+            with progress.phase("insert"), contextlib.redirect_stdout(io.StringIO()) as messages:
+                result = self.expense_manager.addexpense(
+                    amount, 
+                    category_norm, 
+                    payment_method_norm,
+                    date, 
+                    description, 
+                    tag_norm, 
+                    payment_detail_identifier, 
+                    import_fn=1
+                )
+            
+            if result:
+                progress.success += 1
+            else:
+                progress.reject(i, messages.getvalue().strip() or "Failed to import row.")
+            progress.update(1, lines.offset)
+
+    def _chunked_import(self, file_path, source_format, batch_size, workers=0):
+        """Stream the file in chunks of batch_size rows, committing a checkpoint after every chunk.
+        
+        With workers > 0 the chunks are parsed by a pool of that many processes.
+        """
+        progress = None
+        try:
+            checksum = _file_checksum(file_path)
+            self._ensure_checkpoint_tables()
+            
+            with _open_binary(file_path) as raw:
+                lines = _TrackedLines(raw)
+                rows, first_line = _read_rows(lines, source_format)
+                if rows is None:
+                    return False
+                
+                last_line = first_line - 1
+                
+                # Continue after the last committed chunk if this file was interrupted before
+                self.cursor.execute(
+                    "SELECT last_line, byte_offset, success_count, error_count, duplicate_count FROM import_checkpoint WHERE username = ? AND file_checksum = ?",
+                    (self.current_user, checksum))
+                checkpoint = self.cursor.fetchone()
+                progress = ImportProgress(_rejects_path(file_path), _plain_size(file_path), append=checkpoint is not None)
+                if checkpoint is not None:
+                    last_line, byte_offset, progress.success, progress.failed, progress.duplicate = checkpoint
+                    raw.seek(byte_offset)  # Offsets are in decompressed bytes for compressed sources
+                    lines.offset = byte_offset
+                    print(f"Resuming import of '{file_path}' after row {last_line}.")
+                
+                dimensions = self._load_dimensions()
+                numbered_rows = _number_rows(rows, source_format, last_line + 1)
+                
+                # Workers parse and validate chunks while this process, the only writer, inserts them.
+                # At most two chunks per worker are in flight so memory stays bounded.
+                executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else _InlineExecutor()
+                max_pending = max(1, workers * 2)
+                pending = deque()
+                
+                with executor:
+                    while True:
+                        with progress.phase("parse"):
+                            chunk = list(itertools.islice(numbered_rows, batch_size))
+                        if chunk:
+                            with progress.phase("validate"):
+                                pending.append((chunk[-1][0], lines.offset, len(chunk), executor.submit(parse_import_rows, chunk)))
+                            if len(pending) < max_pending:
+                                continue
+                        if not pending:
+                            break
                         
-                    # Call addexpense and check return value
-                    result = self.expense_manager.addexpense(
-                        amount, 
-                        category_norm, 
-                        payment_method_norm,
-                        date, 
-                        description, 
-                        tag_norm, 
-                        payment_detail_identifier, 
-                        import_fn=1
-                    )
-                    
-                    if result:
-                        success_count += 1
-                        # Add to our tracking set after successful import
-                        imported_expenses.add(expense_key)
-                    else:
-                        error_count += 1
-                        print(f"Failed to import row {i}")
+                        chunk_last_line, chunk_offset, chunk_rows, parsed = pending.popleft()
+                        with progress.phase("validate"):
+                            records = self._collect_parsed(parsed.result(), progress)
                         
-                print(f"Import complete: {success_count} successful, {error_count} failed, {duplicate_count} duplicates skipped.")
-                return True
-                
+                        with progress.phase("insert"):
+                            self._begin_write()
+                            
+                            # Rows from earlier chunks or earlier imports are found through the content hash index
+                            seen = self._existing_hashes([record[0] for _, record in records])
+                            self._write_batch(records, dimensions, seen, progress)
+                            
+                            self.cursor.execute(
+                                "INSERT OR REPLACE INTO import_checkpoint (username, file_checksum, file_path, last_line, byte_offset, success_count, error_count, duplicate_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                (self.current_user, checksum, file_path, chunk_last_line, chunk_offset, progress.success, progress.failed, progress.duplicate))
+                            self.conn.commit()
+                            if self.report_cache is not None:
+                                self.report_cache.bump()
+                        progress.update(chunk_rows, chunk_offset)
+            
+            # The whole file is in, so the checkpoint is no longer needed
+            self.cursor.execute("DELETE FROM import_checkpoint WHERE username = ? AND file_checksum = ?", (self.current_user, checksum))
+            self.conn.commit()
+            
         except FileNotFoundError:
             print(f"Error: File '{file_path}' not found.")
             return False
+        except sqlite3.Error as e:
+            if progress:
+                progress.close()
+            print(f"Database error during import, progress up to the last checkpoint is kept: {e}")
+            self.conn.rollback()
+            self.dimension_cache.refresh()
+            return False
         except Exception as e:
+            if progress:
+                progress.close()
             print(f"Error while importing CSV: {e}")
+            self.conn.rollback()
+            self.dimension_cache.refresh()
+            return False
+        
+        progress.summary()
+        return True
+
+    def _bulk_import(self, numbered_rows, lines, progress):
+        """Import all rows in one transaction, writing each table with executemany"""
+        dimensions = self._load_dimensions()
+        seen = set()
+        
+        try:
+            self._begin_write()
+            while True:
+                # Parsing in chunks only keeps the progress line moving; nothing is committed until the end
+                with progress.phase("parse"):
+                    chunk = list(itertools.islice(numbered_rows, DEFAULT_BATCH_SIZE))
+                if not chunk:
+                    break
+                with progress.phase("validate"):
+                    records = self._parse_rows(chunk, progress)
+                with progress.phase("insert"):
+                    seen.update(self._existing_hashes([record[0] for _, record in records]))
+                    self._write_batch(records, dimensions, seen, progress)
+                progress.update(len(chunk), lines.offset)
+            
+            with progress.phase("insert"):
+                self.conn.commit()
+            if self.report_cache is not None:
+                self.report_cache.bump()
+        except sqlite3.Error as e:
+            progress.close()
+            print(f"Database error during bulk import, no rows were imported: {e}")
+            self.conn.rollback()
+            self.dimension_cache.refresh()
+            return False
+        except Exception as e:
+            # Rows are still being read inside the transaction, so a bad later chunk must undo the earlier ones
+            progress.close()
+            print(f"Error during bulk import, no rows were imported: {e}")
+            self.conn.rollback()
+            self.dimension_cache.refresh()
             return False
+        
+        progress.summary()
+        return True
+
+    def _dry_run(self, numbered_rows, batch_size):
+        """Validate every row without writing, checking each column a batch at a time"""
+        import numpy as np
+        
+        known_categories = list(self.dimension_cache.categories())
+        known_payment_methods = list(self.dimension_cache.payment_methods())
+        
+        # Error type -> line numbers, in the order the types are reported
+        errors = {
+            "Incorrect number of fields": [],
+            "Invalid amount": [],
+            "Invalid date": [],
+            "Unknown category": [],
+            "Unknown payment method": []
+        }
+        rows_checked = 0
+        
+        while True:
+            chunk = list(itertools.islice(numbered_rows, batch_size))
+            if not chunk:
+                break
+            rows_checked += len(chunk)
+            
+            complete = [(i, row) for i, row in chunk if len(row) >= 6]
+            errors["Incorrect number of fields"].extend(i for i, row in chunk if len(row) < 6)
+            if not complete:
+                continue
+            
+            lines = np.array([i for i, _ in complete])
+            columns = np.array([row[:6] for _, row in complete], dtype=str)
+            amounts, categories, payment_methods, dates = columns[:, 0], columns[:, 1], columns[:, 2], columns[:, 3]
+            
+            errors["Invalid amount"].extend(lines[~_valid_amounts(amounts)].tolist())
+            errors["Invalid date"].extend(lines[~_valid_dates(np.char.strip(dates))].tolist())
+            errors["Unknown category"].extend(
+                lines[~np.isin(np.char.lower(np.char.strip(categories)), known_categories)].tolist())
+            errors["Unknown payment method"].extend(
+                lines[~np.isin(np.char.lower(np.char.strip(payment_methods)), known_payment_methods)].tolist())
+        
+        bad_lines = set()
+        for line_numbers in errors.values():
+            bad_lines.update(line_numbers)
+        
+        print(f"\nDry run: {rows_checked} row(s) checked, {rows_checked - len(bad_lines)} valid, {len(bad_lines)} with errors. Nothing was imported.")
+        if bad_lines:
+            print("-" * 60)
+            for error_type, line_numbers in errors.items():
+                if not line_numbers:
+                    continue
+                shown = ", ".join(str(i) for i in sorted(line_numbers)[:20])
+                more = f" ... and {len(line_numbers) - 20} more" if len(line_numbers) > 20 else ""
+                print(f"{error_type}: {len(line_numbers)} row(s) - lines {shown}{more}")
+            print("-" * 60)
+        return not bad_lines
+
+    def _begin_write(self):
+        # The expense ids handed out by _write_batch stay ours while we hold the lock
+        begin_write(self.cursor, self.conn)
+
+    def _load_dimensions(self):
+        """Category, payment method and tag name->id maps, shared with the other managers"""
+        return self.dimension_cache.categories(), self.dimension_cache.payment_methods(), self.dimension_cache.tags()
+
+    def _parse_rows(self, numbered_rows, progress):
+        """Parse (line, row) pairs in this process and report the rows that were rejected"""
+        return self._collect_parsed(parse_import_rows(numbered_rows), progress)
+
+    def _collect_parsed(self, parsed, progress):
+        records, errors = parsed
+        for i, message in errors:
+            progress.reject(i, message)
+        return records
+
+    def _write_batch(self, records, dimensions, seen, progress):
+        """Insert parsed records with one executemany per table; must run inside a write transaction.
+        
+        Records whose content hash is in `seen` are skipped as duplicates; imported hashes are added to it.
+        """
+        categories, payment_methods, tags = dimensions
+        accepted = []
+        
+        for i, record in records:
+            expense_hash, amount, category, payment_method, date, year, month, description, tag, payment_detail_identifier = record
+            
+            if expense_hash in seen:
+                progress.reject(i, "Duplicate expense detected.", duplicate=True)
+                continue
+            
+            # Same checks addexpense makes, against the preloaded dictionaries
+            category_id = categories.get(category)
+            if category_id is None:
+                progress.reject(i, f"Category '{category}' does not exist.")
+                continue
+            
+            payment_method_id = payment_methods.get(payment_method)
+            if payment_method_id is None:
+                progress.reject(i, f"Payment Method '{payment_method}' does not exist.")
+                continue
+            
+            accepted.append((expense_hash, amount, category_id, payment_method_id, date, year, month, description, tag, payment_detail_identifier))
+            seen.add(expense_hash)
+            progress.success += 1
+        
+        # Create all tags this batch needs at once, then read their ids back in one pass
+        missing_tags = {record[8] for record in accepted if record[8] not in tags}
+        if missing_tags:
+            self._upsert_tags(missing_tags, tags)
+        
+        self.cursor.execute("SELECT COALESCE(MAX(expense_id), 0) FROM Expense")
+        next_expense_id = self.cursor.fetchone()[0] + 1
+        
+        expense_rows = []
+        category_rows = []
+        tag_rows = []
+        payment_method_rows = []
+        user_rows = []
+        
+        for expense_hash, amount, category_id, payment_method_id, date, year, month, description, tag, payment_detail_identifier in accepted:
+            expense_id = next_expense_id
+            next_expense_id += 1
+            
+            expense_rows.append((expense_id, date, year, month, amount, description))
+            category_rows.append((category_id, expense_id))
+            tag_rows.append((tags[tag], expense_id))
+            payment_method_rows.append((payment_method_id, expense_id, payment_detail_identifier))
+            user_rows.append((self.current_user, expense_id, expense_hash))
+        
+        self.cursor.executemany(
+            "INSERT INTO category_expense (category_id, expense_id) VALUES (?, ?)",
+            category_rows)
+        self.cursor.executemany(
+            "INSERT INTO tag_expense (tag_id, expense_id) VALUES (?, ?)",
+            tag_rows)
+        self.cursor.executemany(
+            "INSERT INTO payment_method_expense (payment_method_id, expense_id, payment_detail_identifier) VALUES (?, ?, ?)",
+            payment_method_rows)
+        self.cursor.executemany(
+            "INSERT INTO user_expense (username, expense_id, content_hash) VALUES (?, ?, ?)",
+            user_rows)
+        # Expense goes last so its expense_fact trigger finds every link already in place
+        self.cursor.executemany(
+            "INSERT INTO Expense (expense_id, date, year, month, amount, description) VALUES (?, ?, ?, ?, ?, ?)",
+            expense_rows)
+
+    def _upsert_tags(self, tag_names, tags):
+        """Insert any of `tag_names` not yet in Tags and record all their ids in `tags`"""
+        tag_names = sorted(tag_names)
+        self.cursor.executemany("INSERT OR IGNORE INTO Tags (tag_name) VALUES (?)", [(name,) for name in tag_names])
+        for start in range(0, len(tag_names), 500):
+            part = tag_names[start:start + 500]
+            self.cursor.execute(
+                f"SELECT tag_name, tag_id FROM Tags WHERE tag_name IN ({','.join('?' * len(part))})",
+                part)
+            tags.update(self.cursor.fetchall())
+
+    def _ensure_checkpoint_tables(self):
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS import_checkpoint (
+                username TEXT NOT NULL,
+                file_checksum TEXT NOT NULL,  -- sha256 of the whole file
+                file_path TEXT,
+                last_line INTEGER NOT NULL,   -- last row committed
+                byte_offset INTEGER NOT NULL, -- where the next row starts
+                success_count INTEGER NOT NULL DEFAULT 0,
+                error_count INTEGER NOT NULL DEFAULT 0,
+                duplicate_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (username, file_checksum)
+            )""")
+        self.conn.commit()
+
+    def _existing_hashes(self, hashes):
+        """Return the hashes among `hashes` that the current user already has an expense for"""
+        found = set()
+        for start in range(0, len(hashes), 500):
+            part = hashes[start:start + 500]
+            self.cursor.execute(
+                f"SELECT content_hash FROM user_expense WHERE username = ? AND content_hash IN ({','.join('?' * len(part))})",
+                [self.current_user] + part)
+            found.update(row[0] for row in self.cursor.fetchall())
+        return found
+
+    def backfill_content_hashes(self):
+        """Compute content hashes for expenses stored before hashing existed.
+        
+        When several existing expenses of a user share the same content only the
+        oldest gets the hash; the others stay NULL and are reported.
+        """
+        try:
+            self.cursor.execute("""
+                SELECT ue.username, ue.expense_id, e.amount, c.category_name, pm.payment_method_name,
+                       e.date, e.description, t.tag_name
+                FROM user_expense ue
+                JOIN Expense e ON ue.expense_id = e.expense_id
+                LEFT JOIN category_expense ce ON e.expense_id = ce.expense_id
+                LEFT JOIN Categories c ON ce.category_id = c.category_id
+                LEFT JOIN payment_method_expense pme ON e.expense_id = pme.expense_id
+                LEFT JOIN Payment_Method pm ON pme.payment_method_id = pm.payment_method_id
+                LEFT JOIN tag_expense te ON e.expense_id = te.expense_id
+                LEFT JOIN Tags t ON te.tag_id = t.tag_id
+                WHERE ue.content_hash IS NULL
+                ORDER BY ue.expense_id
+            """)
+            updates = []
+            for username, expense_id, amount, category, payment_method, date, description, tag in self.cursor.fetchall():
+                key = expense_key(amount, category or "", payment_method or "", date, description, tag or "")
+                updates.append((content_hash(key), username, expense_id))
+            
+            changes_before = self.conn.total_changes
+            # OR IGNORE leaves later copies of the same content without a hash instead of failing
+            self.cursor.executemany(
+                "UPDATE OR IGNORE user_expense SET content_hash = ? WHERE username = ? AND expense_id = ?",
+                updates)
+            hashed = self.conn.total_changes - changes_before
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"Database error while backfilling content hashes: {e}")
+            self.conn.rollback()
+            return False
+        
+        print(f"Backfill complete: {hashed} expense(s) hashed, {len(updates) - hashed} left unhashed as duplicates of an existing expense.")
+        return True
 
     def export_csv(self, file_path, sort_field=None):
         # Mapping allowed sort fields to actual SQL columns
@@ -0,0 +1,54 @@
+class DimensionCache:
+    """In-process name -> id maps for Categories, Tags and Payment_Method.
+
+    Each map is read from the database the first time it is needed and then kept
+    up to date by the managers that insert into these tables. refresh() drops
+    everything so the next lookup reloads from the database.
+    """
+    TABLES = {
+        "category": ("Categories", "category_name", "category_id"),
+        "tag": ("Tags", "tag_name", "tag_id"),
+        "payment_method": ("Payment_Method", "payment_method_name", "payment_method_id")
+    }
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.maps = {}
+
+    def _load(self, kind):
+        if kind not in self.maps:
+            table, name_column, id_column = self.TABLES[kind]
+            self.cursor.execute(f"SELECT {name_column}, {id_column} FROM {table}")
+            self.maps[kind] = dict(self.cursor.fetchall())
+        return self.maps[kind]
+
+    def categories(self):
+        return self._load("category")
+
+    def tags(self):
+        return self._load("tag")
+
+    def payment_methods(self):
+        return self._load("payment_method")
+
+    def category_id(self, category_name):
+        return self.categories().get(category_name)
+
+    def tag_id(self, tag_name):
+        return self.tags().get(tag_name)
+
+    def payment_method_id(self, payment_method_name):
+        return self.payment_methods().get(payment_method_name)
+
+    def add_category(self, category_name, category_id):
+        self.categories()[category_name] = category_id
+
+    def add_tag(self, tag_name, tag_id):
+        self.tags()[tag_name] = tag_id
+
+    def add_payment_method(self, payment_method_name, payment_method_id):
+        self.payment_methods()[payment_method_name] = payment_method_id
+
+    def refresh(self):
+        """Forget all cached ids; call after a rollback that may have discarded inserted rows"""
+        self.maps.clear()
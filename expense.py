@@ -1,10 +1,37 @@
 import sqlite3
+from datetime import datetime
+from dimension_cache import DimensionCache
+from expense_hash import content_hash, expense_key
+from filters import compile_filters
+from read_pool import pooled_reads
+
+# Rows fetched per round trip while listing, so memory stays bounded on large results
+LIST_FETCH_SIZE = 500
+
+
+def expense_period(date):
+    """(year, month) stored alongside an expense's date, or (None, None) if it is not YYYY-MM-DD"""
+    try:
+        parsed = datetime.strptime(date.strip(), "%Y-%m-%d")
+    except (ValueError, AttributeError):
+        return None, None
+    return parsed.year, parsed.month
+
+
+def begin_write(cursor, conn):
+    """Take the write lock up front, so ids picked with MAX(expense_id) stay ours until commit"""
+    if not conn.in_transaction:
+        cursor.execute("BEGIN IMMEDIATE")
+
 
 class ExpenseManager:
-    def __init__(self, cursor, conn):
+    def __init__(self, cursor, conn, dimension_cache=None, read_pool=None, report_cache=None):
         self.conn = conn
         self.cursor = cursor
+        self.read_pool = read_pool
+        self.report_cache = report_cache
         self.current_user = None
+        self.dimension_cache = dimension_cache or DimensionCache(cursor)
     
     def set_current_user(self, username):
         self.current_user = username
@@ -17,49 +44,40 @@ class ExpenseManager:
             print(f"Error: Invalid amount '{amount}'. Must be a number.")
             return False
         
+        # Category and payment method must already exist; check them before writing anything
+        category_id = self.dimension_cache.category_id(category)
+        if category_id is None:
+            print(f"Error: Category '{category}' does not exist. Adding failed!")
+            return False
+        
+        payment_method_id = self.dimension_cache.payment_method_id(payment_method)
+        if payment_method_id is None:
+            print(f"Error: Payment Method '{payment_method}' does not exist. Adding failed!")
+            return False
+        
         try:
-            self.cursor.execute(
-            "INSERT INTO Expense (date, amount, description) VALUES (?, ?, ?)", 
-            (date, amount, description))
-
-            expense_id = self.cursor.lastrowid
+            # The id SQLite would assign, taken under the write lock; the links go in first
+            # so the expense_fact and expense_monthly triggers see the finished expense once
+            begin_write(self.cursor, self.conn)
+            self.cursor.execute("SELECT COALESCE(MAX(expense_id), 0) + 1 FROM Expense")
+            expense_id = self.cursor.fetchone()[0]
             
-            # Check if category exists
-            self.cursor.execute("SELECT category_id FROM Categories WHERE category_name = ?", (category,))
-            result = self.cursor.fetchone()
-            if result is None:
-                print(f"Error: Category '{category}' does not exist. Adding failed!")
-                self.conn.rollback()
-                return False
-            
-            category_id = result[0]  # Extract category_id
             self.cursor.execute(
             "INSERT INTO category_expense (category_id,expense_id) VALUES (?, ?)", 
             (category_id,expense_id))
             
-            self.cursor.execute("SELECT tag_id FROM Tags WHERE tag_name = ?", (tag,))
-            result = self.cursor.fetchone()
-            if result is None:
+            tag_id = self.dimension_cache.tag_id(tag)
+            if tag_id is None:
                 self.cursor.execute(
                 "INSERT INTO Tags (tag_name) VALUES (?)", 
                 (tag,))
                 tag_id = self.cursor.lastrowid
-            else:
-                tag_id = result[0]
+                self.dimension_cache.add_tag(tag, tag_id)
                 
             self.cursor.execute(
             "INSERT INTO tag_expense (tag_id,expense_id) VALUES (?, ?)", 
             (tag_id,expense_id))
             
-            
-            self.cursor.execute("SELECT payment_method_id FROM Payment_Method WHERE Payment_Method_Name = ?", (payment_method,))
-            result = self.cursor.fetchone()
-            if result is None:
-                print(f"Error: Payment Method '{payment_method}' does not exist. Adding failed!")
-                self.conn.rollback()
-                return False
-            
-            payment_method_id = result[0]  # Extract payment_method_id
             self.cursor.execute(
             "INSERT INTO payment_method_expense(payment_method_id,expense_id,payment_detail_identifier) VALUES (?, ?,?)", 
             (payment_method_id,expense_id,payment_detail_identifier))
@@ -68,7 +86,20 @@ class ExpenseManager:
             "INSERT INTO user_expense(username,expense_id) VALUES (?, ?)", 
             (self.current_user,expense_id))
             
+            year, month = expense_period(date)
+            self.cursor.execute(
+            "INSERT INTO Expense (expense_id, date, year, month, amount, description) VALUES (?, ?, ?, ?, ?, ?)", 
+            (expense_id, date, year, month, amount, description))
+            
+            # Hash for duplicate detection on import; a repeat of an existing expense keeps NULL
+            key = expense_key(amount, category, payment_method, date, description, tag)
+            self.cursor.execute(
+            "UPDATE OR IGNORE user_expense SET content_hash = ? WHERE username = ? AND expense_id = ?", 
+            (content_hash(key), self.current_user, expense_id))
+            
             self.conn.commit()
+            if self.report_cache is not None:
+                self.report_cache.bump()
             if import_fn == 0:
                 print("Expense Added Successfully")
             return True
@@ -76,6 +107,8 @@ class ExpenseManager:
         except sqlite3.Error as e:
             print(f"Database error adding expense: {e}")
             self.conn.rollback()
+            # A tag inserted above may have been rolled back with the rest
+            self.dimension_cache.refresh()
             return False
     
     def update_expense(self, expense_id, field, new_value):
@@ -93,43 +126,68 @@ class ExpenseManager:
             elif field == 'description':
                 self.cursor.execute("UPDATE Expense SET description = ? WHERE expense_id = ?", (new_value, expense_id))
             elif field == 'date':
-                self.cursor.execute("UPDATE Expense SET date = ? WHERE expense_id = ?", (new_value, expense_id))
+                year, month = expense_period(new_value)
+                self.cursor.execute("UPDATE Expense SET date = ?, year = ?, month = ? WHERE expense_id = ?", (new_value, year, month, expense_id))
             elif field == 'category':
-                self.cursor.execute("SELECT category_id FROM Categories WHERE category_name = ?", (new_value,))
-                category = self.cursor.fetchone()
-                if category is None:
+                category_id = self.dimension_cache.category_id(new_value)
+                if category_id is None:
                     print(f"Error: Category '{new_value}' does not exist.")
                     return False
-                category_id = category[0]
                 self.cursor.execute("UPDATE category_expense SET category_id = ? WHERE expense_id = ?", (category_id, expense_id))
             elif field == 'tag':
-                self.cursor.execute("SELECT tag_id FROM Tags WHERE tag_name = ?", (new_value,))
-                tag = self.cursor.fetchone()
-                if tag is None:
+                tag_id = self.dimension_cache.tag_id(new_value)
+                if tag_id is None:
                     self.cursor.execute("INSERT INTO Tags (tag_name) VALUES (?)", (new_value,))
                     tag_id = self.cursor.lastrowid
-                else:
-                    tag_id = tag[0]
+                    self.dimension_cache.add_tag(new_value, tag_id)
                 self.cursor.execute("UPDATE tag_expense SET tag_id = ? WHERE expense_id = ?", (tag_id, expense_id))
             elif field == 'payment_method':
-                self.cursor.execute("SELECT payment_method_id FROM Payment_Method WHERE payment_method_name = ?", (new_value,))
-                payment_method = self.cursor.fetchone()
-                if payment_method is None:
+                payment_method_id = self.dimension_cache.payment_method_id(new_value)
+                if payment_method_id is None:
                     print(f"Error: Payment Method '{new_value}' doesn't exist.")
                     return False
-                payment_method_id = payment_method[0]
                 self.cursor.execute("UPDATE payment_method_expense SET payment_method_id = ? WHERE expense_id = ?", (payment_method_id, expense_id))
             else:
                 print(f"Error: Field '{field}' is not valid for updating.")
                 return False
 
+            self._rehash_expense(expense_id)
             self.conn.commit()
+            if self.report_cache is not None:
+                self.report_cache.bump()
             print(f"Expense ID {expense_id} updated successfully.")
             return True
         except sqlite3.Error as e:
             print(f"Error: Failed to update expense. {e}")
+            self.conn.rollback()
+            self.dimension_cache.refresh()
             return False
     
+    def _rehash_expense(self, expense_id):
+        """Recompute the content hash of an expense after one of its fields changed"""
+        self.cursor.execute("""
+            SELECT e.amount, c.category_name, pm.payment_method_name, e.date, e.description, t.tag_name
+            FROM Expense e
+            LEFT JOIN category_expense ce ON e.expense_id = ce.expense_id
+            LEFT JOIN Categories c ON ce.category_id = c.category_id
+            LEFT JOIN payment_method_expense pme ON e.expense_id = pme.expense_id
+            LEFT JOIN Payment_Method pm ON pme.payment_method_id = pm.payment_method_id
+            LEFT JOIN tag_expense te ON e.expense_id = te.expense_id
+            LEFT JOIN Tags t ON te.tag_id = t.tag_id
+            WHERE e.expense_id = ?
+        """, (expense_id,))
+        amount, category, payment_method, date, description, tag = self.cursor.fetchone()
+        try:
+            key = expense_key(amount, category or "", payment_method or "", date, description, tag or "")
+        except ValueError:
+            key = None  # amount is no longer numeric; such a row cannot match an import
+        
+        self.cursor.execute("UPDATE user_expense SET content_hash = NULL WHERE expense_id = ?", (expense_id,))
+        if key is not None:
+            self.cursor.execute(
+                "UPDATE OR IGNORE user_expense SET content_hash = ? WHERE expense_id = ?",
+                (content_hash(key), expense_id))
+    
     def delete_expense(self, expense_id):
         self.cursor.execute("SELECT COUNT(*) FROM user_expense WHERE expense_id = ? AND username = ?", (expense_id, self.current_user))
         exists = self.cursor.fetchone()[0] > 0  # True if count > 0, else False
@@ -148,117 +206,57 @@ class ExpenseManager:
             self.cursor.execute("DELETE FROM Expense WHERE expense_id = ?", (expense_id,))
             
             self.conn.commit()
+            if self.report_cache is not None:
+                self.report_cache.bump()
             print(f"Expense ID {expense_id} deleted successfully.")
             return True
         except sqlite3.Error as e:
             print(f"Error: Failed to delete expense. {e}")
             return False
     
-    def list_expenses(self, filters={}, user_role=None):
+    @pooled_reads
+    def list_expenses(self, filters=None, user_role=None, limit=None, after=None, show_count=False, order=None):
+        """List expenses matching a predicate tree from filters.parse_filters.
+
+        Rows are streamed in LIST_FETCH_SIZE batches. `order` is "id" (the default) or
+        "date", ordering by date then expense_id. `after` is a keyset from
+        filters.parse_keyset: (expense_id,) pages in id order, (date, expense_id) in
+        date order and implies it. `show_count` runs a second query for the total across all pages.
+        """
         try:
-            # Initial query to connect all required tables
+            # expense_fact already holds every expense joined to its category, tag, payment method and owner
             query = """
             SELECT e.expense_id, e.date, e.amount, e.description, 
-                c.category_name, t.tag_name, pm.payment_method_name, ue.username
-            FROM Expense e
-            LEFT JOIN category_expense ce ON e.expense_id = ce.expense_id
-            LEFT JOIN Categories c ON ce.category_id = c.category_id
-            LEFT JOIN tag_expense te ON e.expense_id = te.expense_id
-            LEFT JOIN Tags t ON te.tag_id = t.tag_id
-            LEFT JOIN payment_method_expense pme ON e.expense_id = pme.expense_id
-            LEFT JOIN Payment_Method pm ON pme.payment_method_id = pm.payment_method_id
-            LEFT JOIN user_expense ue ON e.expense_id = ue.expense_id
+                e.category_name, e.tag_name, e.payment_method_name, e.username
+            FROM expense_fact e
             """
             
-            params = []
-            
-            # Check if current user is admin or regular user
-            if user_role != "admin":
-                # Regular user can only see their own expenses
-                query += """
-                WHERE e.expense_id IN (
-                    SELECT expense_id FROM user_expense WHERE username = ?
-                )
-                """
-                params.append(self.current_user)
+            # Regular users can only see their own expenses
+            where, params = compile_filters(filters or [], None if user_role == "admin" else self.current_user)
             
-            # Define operation fields
-            op_fields = {"and": ["amount", "date"], 
-                        "or": ["category", "tag", "payment_method", "month"]}
+            total = None
+            if show_count:
+                self.cursor.execute("SELECT COUNT(*) FROM expense_fact e" + where, params)
+                total = self.cursor.fetchone()[0]
             
-            # Month name to number mapping
-            month_mapping = {
-                "january": "01", "february": "02", "march": "03", "april": "04",
-                "may": "05", "june": "06", "july": "07", "august": "08",
-                "september": "09", "october": "10", "november": "11", "december": "12"
-            }
-            
-            # Process filters
-            for field in filters:
-                if not filters[field]:  # Skip empty filter lists
-                    continue
-                    
-                if field in op_fields["and"]:
-                    op = "AND"
-                else:
-                    op = "OR"
-                    
-                # Special handling for month
-                if field == "month":
-                    connector = "WHERE" if "WHERE" not in query else "AND"
-                    query += f" {connector} ("
-                    first = True
-                    for constraint in filters[field]:
-                        op_type, value = constraint
-                        if not first:
-                            query += f" {op} "
-                        first = False
-                        
-                        # Handle month name conversion
-                        if isinstance(value, str) and value.lower() in month_mapping:
-                            month_num = month_mapping[value.lower()]
-                            query += f"strftime('%m', e.date) {op_type} ?"
-                            params.append(month_num)
-                        else:
-                            # Assume it's a number
-                            query += f"strftime('%m', e.date) {op_type} ?"
-                            # Ensure month is zero-padded
-                            if isinstance(value, str) and len(value) == 1:
-                                params.append(value.zfill(2))
-                            else:
-                                params.append(value)
-                    query += ")"
-                    continue
-                    
-                # Handle regular fields with mapping to actual DB columns
-                field_mapping = {
-                    "amount": "e.amount",
-                    "date": "e.date",
-                    "category": "c.category_name",
-                    "tag": "t.tag_name",
-                    "payment_method": "pm.payment_method_name"
-                }
-                
-                db_field = field_mapping.get(field, field)
-                
-                connector = "WHERE" if "WHERE" not in query else "AND"
-                query += f" {connector} ("
-                first = True
-                for constraint in filters[field]:
-                    op_type, value = constraint
-                    if not first:
-                        query += f" {op} "
-                    first = False
-                    query += f"{db_field} {op_type} ?"
-                    params.append(value)
-                query += ")"
+            by_date = order == "date" or (after is not None and len(after) == 2)
+            query += where
+            if after is not None:
+                query += (" AND " if where else " WHERE ") + ("(e.date, e.expense_id) > (?, ?)" if by_date else "e.expense_id > ?")
+                params = params + list(after)
+            query += " ORDER BY e.date, e.expense_id" if by_date else " ORDER BY e.expense_id"
+            if limit is not None:
+                query += " LIMIT ?"
+                params = params + [limit]
             
             # Execute the query and display results
             self.cursor.execute(query, params)
-            expenses = self.cursor.fetchall()
+            expenses = self.cursor.fetchmany(LIST_FETCH_SIZE)
             
             if not expenses:
                 print("No expenses found matching the criteria.")
+                if total:
+                    print(f"Total: {total} expense(s) match")
                 return True
             
             # Display results in a formatted table
@@ -268,37 +266,41 @@ class ExpenseManager:
             # Add username column for admin view
             if user_role == "admin":
                 print(f"{'ID':<5} {'Date':<12} {'Amount':<10} {'Category':<15} {'Tag':<15} {'Payment Method':<15} {'Username':<10} {'Description':<25}")
-                print("-" * 95)
-                
-                for expense in expenses:
-                    expense_id, date, amount, description, category, tag, payment_method, username = expense
-                    # Handle NULL values from LEFT JOINs
-                    category = category or "N/A"
-                    tag = tag or "N/A"
-                    payment_method = payment_method or "N/A"
-                    username = username or "N/A"
-                    description = (description[:22] + "...") if description and len(description) > 25 else (description or "")
-                    
-                    print(f"{expense_id:<5} {date:<12} {amount:<10.2f} {category:<15} {tag:<15} {payment_method:<15} {username:<10} {description:<25}")
             else:
-                # Original display for regular users
                 print(f"{'ID':<5} {'Date':<12} {'Amount':<10} {'Category':<15} {'Tag':<15} {'Payment Method':<15} {'Description':<30}")
-                print("-" * 95)
-                
+            print("-" * 95)
+            
+            shown = 0
+            while expenses:
                 for expense in expenses:
-                    expense_id, date, amount, description, category, tag, payment_method, _ = expense
+                    expense_id, date, amount, description, category, tag, payment_method, username = expense
                     # Handle NULL values from LEFT JOINs
                     category = category or "N/A"
                     tag = tag or "N/A"
                     payment_method = payment_method or "N/A"
-                    description = (description[:27] + "...") if description and len(description) > 30 else (description or "")
                     
-                    print(f"{expense_id:<5} {date:<12} {amount:<10.2f} {category:<15} {tag:<15} {payment_method:<15} {description:<30}")
+                    if user_role == "admin":
+                        username = username or "N/A"
+                        description = (description[:22] + "...") if description and len(description) > 25 else (description or "")
+                        print(f"{expense_id:<5} {date:<12} {amount:<10.2f} {category:<15} {tag:<15} {payment_method:<15} {username:<10} {description:<25}")
+                    else:
+                        description = (description[:27] + "...") if description and len(description) > 30 else (description or "")
+                        print(f"{expense_id:<5} {date:<12} {amount:<10.2f} {category:<15} {tag:<15} {payment_method:<15} {description:<30}")
+                shown += len(expenses)
+                last = expenses[-1]
+                expenses = self.cursor.fetchmany(LIST_FETCH_SIZE)
             
             print("-" * 95)
-            print(f"Total: {len(expenses)} expense(s) found")
+            if limit is not None:
+                print(f"Showing {shown} expense(s)")
+            elif total is None:
+                print(f"Total: {shown} expense(s) found")
+            if total is not None:
+                print(f"Total: {total} expense(s) match")
+            if limit is not None and shown == limit:
+                position = f"--order date --after {last[1]},{last[0]}" if by_date else f"--after {last[0]}"
+                print(f"Next page: {position}")
             return True
-            
         except sqlite3.Error as e:
             print(f"Database error: {e}")
             self.conn.rollback()
@@ -0,0 +1,19 @@
+import hashlib
+
+
+def expense_key(amount, category, payment_method, date, description, tag):
+    """Normalised tuple that identifies an expense's content for duplicate detection"""
+    return (
+        float(amount),
+        category.strip().lower(),
+        payment_method.strip().lower(),
+        date.strip(),
+        (description or "").strip(),
+        tag.strip().lower()
+    )
+
+
+def content_hash(key):
+    """Stable hex digest of an expense_key tuple, stored in user_expense.content_hash"""
+    return hashlib.sha1("\x1f".join(str(part) for part in key).encode("utf-8")).hexdigest()
+
@@ -0,0 +1,104 @@
+import functools
+from collections import namedtuple
+
+# Two-character operators first so "<=" is not read as "<"
+OPERATORS = ["<=", ">=", "=", "<", ">"]
+
+# Filterable fields, in the order their clauses are emitted, and the expense_fact column behind each
+COLUMNS = {
+    "amount": "e.amount",
+    "date": "e.date",
+    "category": "e.category_name",
+    "tag": "e.tag_name",
+    "payment_method": "e.payment_method_name",
+    "month": "e.month"
+}
+
+# Several constraints on one of these fields narrow a range; on any other field they list alternatives
+RANGE_FIELDS = {"amount", "date"}
+
+# Fields kept by the expense_monthly rollup under the same column names, so their filters compile against it too
+ROLLUP_FIELDS = {"category", "tag", "payment_method", "month"}
+
+MONTHS = {
+    "january": 1, "february": 2, "march": 3, "april": 4,
+    "may": 5, "june": 6, "july": 7, "august": 8,
+    "september": 9, "october": 10, "november": 11, "december": 12
+}
+
+Condition = namedtuple("Condition", "field operator value")
+# All conditions on one field, joined by AND for range fields and OR otherwise; groups are ANDed together
+Group = namedtuple("Group", "field conditions")
+
+
+def _typed_value(field, value):
+    if field == "amount":
+        try:
+            return float(value)
+        except ValueError:
+            raise ValueError(f"Invalid amount '{value}'. Must be a number.")
+    if field == "month":
+        month = MONTHS.get(value.lower()) or (int(value) if value.isdigit() else None)
+        if month is None or not 1 <= month <= 12:
+            raise ValueError(f"Invalid month '{value}'. Use a month name or a number from 1 to 12.")
+        return month
+    return value
+
+
+def parse_filters(filter_str):
+    """Parse "field op value, ..." into a predicate tree: a list of Groups in COLUMNS order.
+
+    Raises ValueError with a message for the user if a constraint cannot be parsed.
+    """
+    conditions = {field: [] for field in COLUMNS}
+    for constraint in filter_str.split(","):
+        constraint = constraint.strip()
+        operator = next((op for op in OPERATORS if op in constraint), None)
+        if operator is None:
+            raise ValueError(f"No valid operator found in filter '{constraint}'")
+
+        field, value = (part.strip() for part in constraint.split(operator, 1))
+        if field not in conditions:
+            raise ValueError(f"Invalid field '{field}'")
+        conditions[field].append(Condition(field, operator, _typed_value(field, value)))
+
+    return [Group(field, tuple(group)) for field, group in conditions.items() if group]
+
+
+# list_expenses orderings; a "date" page's --after position is <date>,<expense_id>
+LIST_ORDERS = ["id", "date"]
+
+
+def parse_keyset(value):
+    """Parse a --after position: "<expense_id>" pages in id order, "<date>,<expense_id>" in date order"""
+    parts = [part.strip() for part in value.split(",")]
+    try:
+        if len(parts) == 1:
+            return (int(parts[0]),)
+        if len(parts) == 2:
+            return (parts[0], int(parts[1]))
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid position '{value}'. Use <expense_id> or <date>,<expense_id>.")
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_shape(shape, owner_only):
+    clauses = ["e.username = ?"] if owner_only else []
+    for field, operators in shape:
+        connector = " AND " if field in RANGE_FIELDS else " OR "
+        clauses.append("(" + connector.join(f"{COLUMNS[field]} {operator} ?" for operator in operators) + ")")
+    return " WHERE " + " AND ".join(clauses) if clauses else ""
+
+
+def compile_filters(groups, username=None):
+    """Return (where_clause, params) over expense_fact aliased as e.
+
+    With a username only that user's expenses match. The clause text depends only on
+    the fields and operators used, so it is built once per shape and the identical
+    SQL lets sqlite3 reuse its prepared statement.
+    """
+    shape = tuple((group.field, tuple(condition.operator for condition in group.conditions)) for group in groups)
+    params = [] if username is None else [username]
+    params.extend(condition.value for group in groups for condition in group.conditions)
+    return _compile_shape(shape, username is not None), params
@@ -0,0 +1,97 @@
+import csv
+import os
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+
+class ImportProgress:
+    """Counters, progress line, rejects file and phase timings for one import run.
+
+    Rejected and duplicate rows go to a CSV rejects file (created on the first
+    rejection) instead of stdout. The progress line is rewritten in place at most
+    once per `interval` seconds.
+    """
+    PHASES = ["parse", "validate", "insert"]
+
+    def __init__(self, rejects_path, total_bytes=None, interval=1.0, append=False):
+        self.rejects_path = rejects_path
+        self.total_bytes = total_bytes  # None when the size of the decoded stream is unknown
+        self.interval = interval
+        self.append = append
+
+        self.success = 0
+        self.failed = 0
+        self.duplicate = 0
+        self.rows = 0  # rows handled by this run, which excludes rows done before a resume
+        self.rejected = 0
+
+        self.timings = dict.fromkeys(self.PHASES, 0.0)
+        self.started = time.perf_counter()
+        self.last_report = self.started
+        self.progress_shown = False
+        self.rejects_file = None
+        self.rejects_writer = None
+
+    def reject(self, line, reason, duplicate=False):
+        if duplicate:
+            self.duplicate += 1
+        else:
+            self.failed += 1
+
+        if self.rejects_writer is None:
+            # A resumed run appends to the previous rejects, which may never have been written
+            new_file = not self.append or not os.path.exists(self.rejects_path) or os.path.getsize(self.rejects_path) == 0
+            self.rejects_file = open(self.rejects_path, "a" if self.append else "w", newline="")
+            self.rejects_writer = csv.writer(self.rejects_file)
+            if new_file:
+                self.rejects_writer.writerow(["line", "reason"])
+        self.rejects_writer.writerow([line, reason])
+        self.rejected += 1
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - start
+
+    def update(self, rows, bytes_read=None):
+        """Count `rows` more rows as handled and redraw the progress line if it is due"""
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self.last_report < self.interval:
+            return
+        self.last_report = now
+
+        elapsed = now - self.started
+        rate = self.rows / elapsed if elapsed else 0.0
+        eta = "?"
+        if self.total_bytes and bytes_read:
+            remaining = elapsed * (self.total_bytes - bytes_read) / bytes_read
+            eta = str(timedelta(seconds=int(max(0, remaining))))
+
+        print(f"\rProcessed {self.rows:,} rows | {rate:,.0f} rows/s | ETA {eta} | {self.failed:,} errors", end="", flush=True)
+        self.progress_shown = True
+
+    def close(self):
+        if self.progress_shown:
+            print()
+            self.progress_shown = False
+        if self.rejects_file is not None:
+            self.rejects_file.close()
+            self.rejects_file = None
+            self.rejects_writer = None
+
+    def summary(self):
+        """Print the final counts, where rejected rows went and how long each phase took"""
+        self.close()
+        total = time.perf_counter() - self.started
+        rate = self.rows / total if total else 0.0
+
+        print(f"Import complete: {self.success} successful, {self.failed} failed, {self.duplicate} duplicates skipped.")
+        if self.rejected:
+            print(f"{self.rejected} rejected row(s) written to {self.rejects_path}")
+        phases = " | ".join(f"{name} {self.timings[name]:.2f}s" for name in self.PHASES)
+        print(f"Timing: {phases} | total {total:.2f}s ({rate:,.0f} rows/s)")
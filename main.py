@@ -1,27 +1,74 @@
+import argparse
+import os
 import sqlite3
 import sys
 from user import UserManager
 from category import CategoryManager
+from charts import CHART_DIR_ENV, CHART_FORMATS, ChartRenderer
 from payment import PaymentManager
 from expense import ExpenseManager
 from csv_operations import CSVOperations
 from reporting import ReportManager
 from parser import CommandParser
+from dimension_cache import DimensionCache
+from migrations import run_migrations
+from read_pool import ReadPool
+from report_cache import ReportCache
+from sqlite_profile import PROFILES, apply_profile, profile_name
 
 def main():
+    arg_parser = argparse.ArgumentParser(description="Expense Reporting App")
+    arg_parser.add_argument("--profile", choices=list(PROFILES),
+                            help="SQLite performance profile (default: $EXPENSE_DB_PROFILE or balanced)")
+    arg_parser.add_argument("--charts", metavar="DIR", default=os.environ.get(CHART_DIR_ENV),
+                            help=f"write report charts to DIR in the background instead of showing them (default: ${CHART_DIR_ENV})")
+    arg_parser.add_argument("--chart-format", choices=CHART_FORMATS, default="png")
+    args = arg_parser.parse_args()
+    try:
+        profile = profile_name(args.profile)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    
     # Connect to the database
     conn = sqlite3.connect("ExpenseReport")  # Creates/opens a database file
     cursor = conn.cursor()  # Creates a cursor object to execute SQL commands
     
+    # Journal mode, syncing and cache sizes come from the profile, before anything else runs
+    try:
+        apply_profile(cursor, profile)
+    except sqlite3.Error as e:
+        print(f"Database error while applying the '{profile}' profile: {e}")
+        conn.close()
+        return
+    
+    # Bring older database files up to the current schema
+    try:
+        run_migrations(cursor, conn)
+    except sqlite3.Error as e:
+        print(f"Database error while upgrading the schema: {e}")
+        conn.close()
+        return
+    
+    # Category, tag and payment method ids shared by every manager that writes expenses
+    dimension_cache = DimensionCache(cursor)
+    
+    # Reports and listings read through their own read-only connections
+    read_pool = ReadPool("ExpenseReport", profile=profile)
+    
+    # Report results, invalidated by every manager that writes and by other processes' commits
+    report_cache = ReportCache(conn)
+    
     # Initialize managers
     user_manager = UserManager(cursor, conn)
-    category_manager = CategoryManager(cursor, conn)
-    payment_manager = PaymentManager(cursor, conn)
-    expense_manager = ExpenseManager(cursor, conn)
+    category_manager = CategoryManager(cursor, conn, dimension_cache, report_cache)
+    payment_manager = PaymentManager(cursor, conn, dimension_cache, report_cache)
+    expense_manager = ExpenseManager(cursor, conn, dimension_cache, read_pool, report_cache)
     
     # Initialize managers that depend on other managers
-    csv_operations = CSVOperations(cursor, conn, expense_manager)
-    report_manager = ReportManager(cursor, conn)
+    csv_operations = CSVOperations(cursor, conn, expense_manager, dimension_cache, report_cache)
+    renderer = ChartRenderer(args.charts, args.chart_format)
+    report_manager = ReportManager(cursor, conn, read_pool, report_cache, renderer)
     
     # Create command parser
     command_parser = CommandParser(
@@ -30,7 +77,8 @@ def main():
         payment_manager, 
         expense_manager, 
         csv_operations, 
-        report_manager
+        report_manager,
+        dimension_cache
     )
     
     print("Expense Reporting App")
@@ -49,7 +97,9 @@ def main():
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
     
-    # Close the connection
+    # Let charts still being drawn finish, then close the connections
+    renderer.close()
+    read_pool.close()
     conn.close()
 
 if __name__ == "__main__":
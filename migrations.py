@@ -0,0 +1,307 @@
+import sqlite3
+from expense import expense_period
+
+
+def _add_column(cursor, table, column, column_type):
+    """ALTER TABLE ADD COLUMN, skipped when the table already has the column"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+
+def _add_content_hash(cursor):
+    """user_expense.content_hash and its unique (username, content_hash) index.
+
+    Databases opened by earlier versions may already have the column, so check first.
+    Rows without a hash are NULL, which the unique index allows any number of.
+    """
+    _add_column(cursor, "user_expense", "content_hash", "TEXT")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_user_expense_content_hash ON user_expense (username, content_hash)")
+
+
+def _add_secondary_indexes(cursor):
+    """Indexes for joining the link tables on expense_id and filtering on date.
+
+    The link tables' primary keys lead with the dimension id, so a join from Expense
+    could not use them. user_expense's (username, expense_id) key already serves
+    lookups by username.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_category_expense_expense ON category_expense (expense_id, category_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tag_expense_expense ON tag_expense (expense_id, tag_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_payment_method_expense_expense ON payment_method_expense (expense_id, payment_method_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_expense_expense ON user_expense (expense_id, username)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expense_date ON Expense (date)")
+    cursor.execute("ANALYZE")
+
+
+# For each table linking an expense to a dimension: the columns whose change moves the
+# link, and the expense_fact columns it fills with their value for the NEW row
+FACT_LINKS = {
+    "category_expense": ("category_id", {
+        "category_name": "(SELECT category_name FROM Categories WHERE category_id = NEW.category_id)"
+    }),
+    "tag_expense": ("tag_id", {
+        "tag_name": "(SELECT tag_name FROM Tags WHERE tag_id = NEW.tag_id)"
+    }),
+    "payment_method_expense": ("payment_method_id, payment_detail_identifier", {
+        "payment_method_name": "(SELECT payment_method_name FROM Payment_Method WHERE payment_method_id = NEW.payment_method_id)",
+        "payment_detail_identifier": "NEW.payment_detail_identifier"
+    }),
+    "user_expense": ("username", {
+        "username": "NEW.username"
+    })
+}
+
+
+def _add_expense_fact(cursor):
+    """expense_fact: one row per expense with its category, tag, payment method and owner by name.
+
+    It is what the list and report queries read instead of joining eight tables. Triggers
+    on Expense and the four link tables keep it in step with every write, whichever of an
+    expense's rows is inserted first. Inserting the links first writes each fact row once.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS expense_fact (
+            expense_id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            amount REAL NOT NULL,
+            description TEXT,
+            category_name TEXT,
+            tag_name TEXT,
+            payment_method_name TEXT,
+            payment_detail_identifier TEXT,
+            username TEXT
+        )""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expense_fact_username ON expense_fact (username, expense_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expense_fact_date ON expense_fact (date)")
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_expense_fact_insert AFTER INSERT ON Expense BEGIN
+            INSERT INTO expense_fact (expense_id, date, amount, description, category_name, tag_name,
+                                      payment_method_name, payment_detail_identifier, username)
+            SELECT NEW.expense_id, NEW.date, NEW.amount, NEW.description,
+                (SELECT c.category_name FROM category_expense ce JOIN Categories c ON ce.category_id = c.category_id
+                 WHERE ce.expense_id = NEW.expense_id),
+                (SELECT t.tag_name FROM tag_expense te JOIN Tags t ON te.tag_id = t.tag_id
+                 WHERE te.expense_id = NEW.expense_id),
+                (SELECT pm.payment_method_name FROM payment_method_expense pme
+                 JOIN Payment_Method pm ON pme.payment_method_id = pm.payment_method_id
+                 WHERE pme.expense_id = NEW.expense_id),
+                (SELECT payment_detail_identifier FROM payment_method_expense WHERE expense_id = NEW.expense_id),
+                (SELECT username FROM user_expense WHERE expense_id = NEW.expense_id);
+        END""")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_expense_fact_update AFTER UPDATE OF date, amount, description ON Expense BEGIN
+            UPDATE expense_fact SET date = NEW.date, amount = NEW.amount, description = NEW.description
+            WHERE expense_id = NEW.expense_id;
+        END""")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_expense_fact_delete AFTER DELETE ON Expense BEGIN
+            DELETE FROM expense_fact WHERE expense_id = OLD.expense_id;
+        END""")
+
+    for table, (link_columns, columns) in FACT_LINKS.items():
+        set_new = ", ".join(f"{column} = {value}" for column, value in columns.items())
+        set_null = ", ".join(f"{column} = NULL" for column in columns)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fact_insert AFTER INSERT ON {table} BEGIN
+                UPDATE expense_fact SET {set_new} WHERE expense_id = NEW.expense_id;
+            END""")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fact_update AFTER UPDATE OF expense_id, {link_columns} ON {table} BEGIN
+                UPDATE expense_fact SET {set_null} WHERE expense_id = OLD.expense_id;
+                UPDATE expense_fact SET {set_new} WHERE expense_id = NEW.expense_id;
+            END""")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fact_delete AFTER DELETE ON {table} BEGIN
+                UPDATE expense_fact SET {set_null} WHERE expense_id = OLD.expense_id;
+            END""")
+
+    cursor.execute("""
+        INSERT OR REPLACE INTO expense_fact (expense_id, date, amount, description, category_name, tag_name,
+                                             payment_method_name, payment_detail_identifier, username)
+        SELECT e.expense_id, e.date, e.amount, e.description, c.category_name, t.tag_name,
+               pm.payment_method_name, pme.payment_detail_identifier, ue.username
+        FROM Expense e
+        LEFT JOIN category_expense ce ON e.expense_id = ce.expense_id
+        LEFT JOIN Categories c ON ce.category_id = c.category_id
+        LEFT JOIN tag_expense te ON e.expense_id = te.expense_id
+        LEFT JOIN Tags t ON te.tag_id = t.tag_id
+        LEFT JOIN payment_method_expense pme ON e.expense_id = pme.expense_id
+        LEFT JOIN Payment_Method pm ON pme.payment_method_id = pm.payment_method_id
+        LEFT JOIN user_expense ue ON e.expense_id = ue.expense_id""")
+    cursor.execute("ANALYZE expense_fact")
+
+
+def _add_expense_period(cursor):
+    """Integer Expense.year and Expense.month, copied into expense_fact and indexed there.
+
+    Writers fill them from the date on insert and update. Month filters and monthly
+    reports then read an index instead of calling strftime() on every row.
+    """
+    for table in ("Expense", "expense_fact"):
+        _add_column(cursor, table, "year", "INTEGER")
+        _add_column(cursor, table, "month", "INTEGER")
+
+    cursor.execute("DROP TRIGGER IF EXISTS trg_expense_fact_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_expense_fact_update")
+    cursor.execute("""
+        CREATE TRIGGER trg_expense_fact_insert AFTER INSERT ON Expense BEGIN
+            INSERT INTO expense_fact (expense_id, date, year, month, amount, description, category_name, tag_name,
+                                      payment_method_name, payment_detail_identifier, username)
+            SELECT NEW.expense_id, NEW.date, NEW.year, NEW.month, NEW.amount, NEW.description,
+                (SELECT c.category_name FROM category_expense ce JOIN Categories c ON ce.category_id = c.category_id
+                 WHERE ce.expense_id = NEW.expense_id),
+                (SELECT t.tag_name FROM tag_expense te JOIN Tags t ON te.tag_id = t.tag_id
+                 WHERE te.expense_id = NEW.expense_id),
+                (SELECT pm.payment_method_name FROM payment_method_expense pme
+                 JOIN Payment_Method pm ON pme.payment_method_id = pm.payment_method_id
+                 WHERE pme.expense_id = NEW.expense_id),
+                (SELECT payment_detail_identifier FROM payment_method_expense WHERE expense_id = NEW.expense_id),
+                (SELECT username FROM user_expense WHERE expense_id = NEW.expense_id);
+        END""")
+    cursor.execute("""
+        CREATE TRIGGER trg_expense_fact_update AFTER UPDATE OF date, year, month, amount, description ON Expense BEGIN
+            UPDATE expense_fact SET date = NEW.date, year = NEW.year, month = NEW.month,
+                                    amount = NEW.amount, description = NEW.description
+            WHERE expense_id = NEW.expense_id;
+        END""")
+
+    # Backfilled in Python so existing rows are parsed exactly like new ones
+    cursor.execute("SELECT expense_id, date FROM Expense")
+    cursor.executemany(
+        "UPDATE Expense SET year = ?, month = ? WHERE expense_id = ?",
+        [(*expense_period(date), expense_id) for expense_id, date in cursor.fetchall()])
+
+    # Covers the monthly group-bys as well as month filters
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expense_fact_month ON expense_fact (month, year, category_name, username, amount)")
+    cursor.execute("ANALYZE expense_fact")
+
+
+def _add_keyset_index(cursor):
+    """Index for a user's expenses in date order, so list_expenses --after <date>,<id> seeks instead of sorting"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expense_fact_username_date ON expense_fact (username, date)")
+    cursor.execute("ANALYZE expense_fact")
+
+
+def _add_category_amount_index(cursor):
+    """Covering index for a user's amounts by category, which above_average_expenses averages without sorting"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expense_fact_username_category ON expense_fact (username, category_name, amount)")
+    cursor.execute("ANALYZE expense_fact")
+
+
+# expense_monthly's grouping columns, as named in expense_fact
+ROLLUP_KEY = ["username", "year", "month", "category_name", "payment_method_name", "tag_name"]
+
+
+def _rollup_match(row, table=""):
+    # IS rather than = so rows with a missing owner, category or date still find their group
+    return " AND ".join(f"{table}{column} IS {row}.{column}" for column in ROLLUP_KEY)
+
+
+def _rollup_add(row):
+    # changes() is the UPDATE's row count here: 0 means the group is new
+    return f"""
+        UPDATE expense_monthly SET total_amount = total_amount + {row}.amount, expense_count = expense_count + 1,
+                                   min_amount = MIN(min_amount, {row}.amount), max_amount = MAX(max_amount, {row}.amount)
+        WHERE {_rollup_match(row)};
+        INSERT INTO expense_monthly ({", ".join(ROLLUP_KEY)}, total_amount, expense_count, min_amount, max_amount)
+        SELECT {", ".join(f"{row}.{column}" for column in ROLLUP_KEY)}, {row}.amount, 1, {row}.amount, {row}.amount
+        WHERE changes() = 0;"""
+
+
+def _rollup_remove(row):
+    # Only removing the group's smallest or largest amount means reading its other expenses
+    return f"""
+        UPDATE expense_monthly SET total_amount = total_amount - {row}.amount, expense_count = expense_count - 1,
+            min_amount = CASE WHEN {row}.amount > min_amount THEN min_amount
+                ELSE (SELECT MIN(amount) FROM expense_fact f WHERE {_rollup_match(row, "f.")}) END,
+            max_amount = CASE WHEN {row}.amount < max_amount THEN max_amount
+                ELSE (SELECT MAX(amount) FROM expense_fact f WHERE {_rollup_match(row, "f.")}) END
+        WHERE {_rollup_match(row)};
+        DELETE FROM expense_monthly WHERE expense_count = 0 AND {_rollup_match(row)};"""
+
+
+def _add_monthly_rollup(cursor):
+    """expense_monthly: sum, count, min and max of amount per owner, month, category, payment method and tag.
+
+    Monthly reports read it instead of grouping every expense, so their cost follows the
+    number of months. Triggers on expense_fact keep it current, which covers every
+    writer since expense_fact itself is trigger-maintained.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS expense_monthly (
+            username TEXT,
+            year INTEGER,
+            month INTEGER,
+            category_name TEXT,
+            payment_method_name TEXT,
+            tag_name TEXT,
+            total_amount REAL NOT NULL,
+            expense_count INTEGER NOT NULL,
+            min_amount REAL,
+            max_amount REAL
+        )""")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_expense_monthly_key ON expense_monthly ({', '.join(ROLLUP_KEY)})")
+    # Covers the monthly group-bys across all users
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expense_monthly_month ON expense_monthly "
+                   "(month, year, category_name, username, total_amount, expense_count)")
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_expense_monthly_insert AFTER INSERT ON expense_fact BEGIN
+            {_rollup_add("NEW")}
+        END""")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_expense_monthly_update
+        AFTER UPDATE OF amount, {", ".join(ROLLUP_KEY)} ON expense_fact BEGIN
+            {_rollup_remove("OLD")}
+            {_rollup_add("NEW")}
+        END""")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_expense_monthly_delete AFTER DELETE ON expense_fact BEGIN
+            {_rollup_remove("OLD")}
+        END""")
+
+    cursor.execute("DELETE FROM expense_monthly")
+    cursor.execute(f"""
+        INSERT INTO expense_monthly ({", ".join(ROLLUP_KEY)}, total_amount, expense_count, min_amount, max_amount)
+        SELECT {", ".join(ROLLUP_KEY)}, SUM(amount), COUNT(*), MIN(amount), MAX(amount)
+        FROM expense_fact
+        GROUP BY {", ".join(ROLLUP_KEY)}""")
+    cursor.execute("ANALYZE expense_monthly")
+
+
+# Append only: a migration's position is its version number, stored in PRAGMA user_version
+MIGRATIONS = [
+    _add_content_hash,
+    _add_secondary_indexes,
+    _add_expense_fact,
+    _add_expense_period,
+    _add_keyset_index,
+    _add_category_amount_index,
+    _add_monthly_rollup
+]
+
+
+def schema_version(cursor):
+    cursor.execute("PRAGMA user_version")
+    return cursor.fetchone()[0]
+
+
+def run_migrations(cursor, conn, target=None):
+    """Bring the database up to `target` (default: the latest version), one transaction per migration"""
+    target = len(MIGRATIONS) if target is None else target
+    version = schema_version(cursor)
+
+    while version < target:
+        migration = MIGRATIONS[version]
+        version += 1
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+    return version
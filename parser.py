@@ -1,14 +1,20 @@
 import shlex
+import time
 from constants import list_of_privileges
+from csv_operations import SOURCE_FORMATS
+from filters import LIST_ORDERS, parse_filters, parse_keyset
+from sqlite_profile import show_pragmas
+from tracing_cursor import TracingCursor
 
 class CommandParser:
-    def __init__(self, user_manager, category_manager, payment_manager, expense_manager, csv_operations, report_manager):
+    def __init__(self, user_manager, category_manager, payment_manager, expense_manager, csv_operations, report_manager, dimension_cache=None):
         self.user_manager = user_manager
         self.category_manager = category_manager
         self.payment_manager = payment_manager
         self.expense_manager = expense_manager
         self.csv_operations = csv_operations
         self.report_manager = report_manager
+        self.dimension_cache = dimension_cache or expense_manager.dimension_cache
     
     def parse(self, cmd_str):
         cmd_str = cmd_str.strip()
@@ -167,61 +173,98 @@ class CommandParser:
                 print(f"Error: Incorrect syntax. Usage: {list_of_privileges['user']['delete_expense']}")
         
         elif cmd == "list_expenses":
-            field_dict = {
-                "amount": [],
-                "date": [],
-                "category": [],
-                "tag": [],
-                "payment_method": [],
-                "month": []
-            }
+            # Filters come first; paging options start at the first "--"
+            filter_part, separator, option_part = cmd_str[len(cmd):].partition("--")
+            filters = []
+            limit = None
+            after = None
+            order = None
+            show_count = False
             
-            field_op = ["<=",">=","=","<",">"]
-            if len(cmd_str_lst) > 1:
-                # Extract the part after the command
-                filter_part = cmd_str[len(cmd):].strip()
-                # Split by comma to get individual constraints
-                constraint_list = filter_part.split(',')
-                
-                for constraint in constraint_list:
-                    constraint = constraint.strip()
-                    operator_found = False
-                    
-                    # Try each operator to see if it exists in the constraint
-                    for op in field_op:
-                        if op in constraint:
-                            # Split by operator
-                            parts = constraint.split(op, 1)  # Split only on first occurrence
-                            if len(parts) == 2:
-                                field = parts[0].strip()
-                                value = parts[1].strip()
-                                
-                                # Validate field
-                                if field not in field_dict:
-                                    print(f"Error: Invalid field '{field}'")
-                                    return
-                                
-                                # Add to field_dict
-                                field_dict[field].append([op, value])
-                                operator_found = True
-                                break
-                            else:
-                                print("Error : Invalid Filter !!")
-                    
-                    if not operator_found:
-                        print(f"Error: No valid operator found in filter '{constraint}'")
+            try:
+                if filter_part.strip():
+                    filters = parse_filters(filter_part.strip())
+                options = shlex.split(separator + option_part)
+            except ValueError as e:
+                print(f"Error: {e}")
+                return
+            
+            while options:
+                option = options.pop(0)
+                if option == "--count":
+                    show_count = True
+                elif option == "--limit" and options:
+                    try:
+                        limit = int(options.pop(0))
+                    except ValueError:
+                        limit = 0
+                    if limit <= 0:
+                        print("Error: Limit must be a positive integer")
                         return
-                
-                self.expense_manager.list_expenses(field_dict, self.user_manager.privileges)
-            else:
-                self.expense_manager.list_expenses(user_role=self.user_manager.privileges)
+                elif option == "--after" and options:
+                    try:
+                        after = parse_keyset(options.pop(0))
+                    except ValueError as e:
+                        print(f"Error: {e}")
+                        return
+                elif option == "--order" and options and options[0] in LIST_ORDERS:
+                    order = options.pop(0)
+                else:
+                    print(f"Error: Incorrect syntax. Usage: {list_of_privileges['user']['list_expenses']}")
+                    return
+            
+            # A <date>,<expense_id> position implies date order; the other combinations don't fit together
+            if after is not None and order is not None and (len(after) == 2) != (order == "date"):
+                print(f"Error: --order {order} pages with --after {'<date>,<expense_id>' if order == 'date' else '<expense_id>'}")
+                return
+            
+            self.expense_manager.list_expenses(filters, self.user_manager.privileges, limit=limit, after=after, show_count=show_count, order=order)
                     
         elif cmd == "import_expenses":
-            if len(cmd_str_lst) != 2:
+            if len(cmd_str_lst) < 2:
                 print(f"Error: Incorrect syntax. Usage: {list_of_privileges['user']['import_expenses']}")
-            else:
-                file_path = cmd_str_lst[1]
-                self.csv_operations.import_expenses(file_path)
+                return
+            
+            file_path = cmd_str_lst[1]
+            bulk = False
+            batch_size = None
+            workers = 0
+            dry_run = False
+            source_format = None
+            
+            options = cmd_str_lst[2:]
+            while options:
+                option = options.pop(0)
+                if option == "--bulk":
+                    bulk = True
+                elif option == "--dry-run":
+                    dry_run = True
+                elif option == "--batch" and options:
+                    try:
+                        batch_size = int(options.pop(0))
+                    except ValueError:
+                        batch_size = 0
+                    if batch_size <= 0:
+                        print("Error: Batch size must be a positive integer")
+                        return
+                elif option == "--format" and options:
+                    source_format = options.pop(0).lower()
+                    if source_format not in SOURCE_FORMATS:
+                        print(f"Error: Unknown format '{source_format}'. Use one of: {', '.join(SOURCE_FORMATS)}")
+                        return
+                elif option == "--workers" and options:
+                    try:
+                        workers = int(options.pop(0))
+                    except ValueError:
+                        workers = -1
+                    if workers < 0:
+                        print("Error: Number of workers must be a non-negative integer")
+                        return
+                else:
+                    print(f"Error: Incorrect syntax. Usage: {list_of_privileges['user']['import_expenses']}")
+                    return
+            
+            self.csv_operations.import_expenses(file_path, bulk=bulk, batch_size=batch_size, workers=workers, dry_run=dry_run, source_format=source_format)
 
         elif cmd == "export_csv":
             # Split by comma to check for optional sort-on parameter
@@ -263,6 +306,43 @@ class CommandParser:
                 # No sorting specified
                 self.csv_operations.export_csv(file_path)
                 
+        # Handling cache maintenance
+        elif cmd == "cache":
+            report_cache = self.report_manager.report_cache
+            if len(cmd_str_lst) != 2 or cmd_str_lst[1] not in ("refresh", "stats"):
+                print(f"Error: Incorrect syntax. Usage: {list_of_privileges[self.user_manager.privileges]['cache']}")
+            elif cmd_str_lst[1] == "stats":
+                if report_cache is None:
+                    print("Report cache is not enabled.")
+                else:
+                    report_cache.print_stats()
+            else:
+                self.dimension_cache.refresh()
+                if report_cache is not None:
+                    report_cache.clear()
+                print("Category, tag and payment method cache and report cache cleared. They will be reloaded on next use.")
+                
+        # Handling pragmas: show the connection's performance settings
+        elif cmd == "pragmas":
+            if len(cmd_str_lst) != 1:
+                print("Error: No arguments required")
+            else:
+                show_pragmas(self.expense_manager.cursor)
+                
+        # Handling backfill_hashes (Admin only)
+        elif cmd == "backfill_hashes":
+            if len(cmd_str_lst) != 1:
+                print("Error: No arguments required")
+            else:
+                self.csv_operations.backfill_content_hashes()
+                
+        # Handling explain: run another command and show the SQL it issued
+        elif cmd == "explain":
+            if len(cmd_str_lst) < 2 or cmd_str_lst[1] == "explain":
+                print(f"Error: Incorrect syntax. Usage: {list_of_privileges[self.user_manager.privileges]['explain']}")
+            else:
+                self.explain(cmd_str[len(cmd):].strip())
+                
         # Handling list_users (Admin only)
         elif cmd == "list_users":
             if len(cmd_str_lst) != 1:
@@ -304,10 +384,15 @@ class CommandParser:
                     self.report_manager.generate_report_category_spending(category)
                     
             elif report_type == "above_average_expenses":
-                if len(cmd_str_lst) != 2:
-                    print("Error: No additional arguments required")
-                else:
+                if len(cmd_str_lst) == 2:
                     self.report_manager.generate_report_above_average_expenses()
+                elif len(cmd_str_lst) == 4 and cmd_str_lst[2] == "--top":
+                    if not cmd_str_lst[3].isdigit() or int(cmd_str_lst[3]) <= 0:
+                        print("Error: --top must be a positive integer")
+                    else:
+                        self.report_manager.generate_report_above_average_expenses(int(cmd_str_lst[3]))
+                else:
+                    print(f"Error: Incorrect syntax. Usage: {list_of_privileges[self.user_manager.privileges]['report']['above_average_expenses']}")
                     
             elif report_type == "monthly_category_spending":
                 if len(cmd_str_lst) != 2:
@@ -346,55 +431,46 @@ class CommandParser:
                     self.report_manager.generate_report_payment_method_details_expense()
                     
             elif report_type == "analyze_expenses":
-                field_dict = {
-                    "amount": [],
-                    "date": [],
-                    "category": [],
-                    "tag": [],
-                    "payment_method": [],
-                    "month": []
-                }
-                
-                field_op = ["<=",">=","=","<",">"]
-                
-                # Check if there are filter arguments
-                if len(cmd_str_lst) > 2:
-                    # Extract everything after "report analyze_expenses"
-                    filter_part = cmd_str[cmd_str.find(report_type) + len(report_type):].strip()
-                    
-                    # Split by comma to get individual constraints
-                    constraint_list = filter_part.split(',')
-                    
-                    for constraint in constraint_list:
-                        constraint = constraint.strip()
-                        operator_found = False
-                        
-                        # Try each operator to see if it exists in the constraint
-                        for op in field_op:
-                            if op in constraint:
-                                # Split by operator
-                                parts = constraint.split(op, 1)  # Split only on first occurrence
-                                if len(parts) == 2:
-                                    field = parts[0].strip()
-                                    value = parts[1].strip()
-                                    
-                                    # Validate field
-                                    if field not in field_dict:
-                                        print(f"Error: Invalid field '{field}'")
-                                        return
-                                    
-                                    # Add to field_dict
-                                    field_dict[field].append([op, value])
-                                    operator_found = True
-                                    break
-                        
-                        if not operator_found:
-                            print(f"Error: No valid operator found in filter '{constraint}'")
-                            return
-                    
-                    self.report_manager.generate_expenses_analytics(field_dict)
-                else:
-                    self.report_manager.generate_expenses_analytics()
+                filter_str = cmd_str[cmd_str.find(report_type) + len(report_type):].strip()
+                in_sql = filter_str.split(" ", 1)[0] == "--sql"
+                if in_sql:
+                    filter_str = filter_str[len("--sql"):].strip()
+                filters = []
+                if filter_str:
+                    try:
+                        filters = parse_filters(filter_str)
+                    except ValueError as e:
+                        print(f"Error: {e}")
+                        return
+                self.report_manager.generate_expenses_analytics(filters, in_sql)
 
         else:
             print("Error: Invalid command")
+
+    def explain(self, cmd_str):
+        """Run cmd_str with every manager's cursor traced, then print its statements, plans and timings"""
+        managers = [self.user_manager, self.category_manager, self.payment_manager, self.expense_manager,
+                    self.csv_operations, self.report_manager, self.dimension_cache]
+        cursors = [manager.cursor for manager in managers]
+        tracer = TracingCursor(self.expense_manager.cursor)
+        for manager in managers:
+            manager.cursor = tracer
+        # Reads on pooled connections are traced too
+        read_pool = self.report_manager.read_pool
+        if read_pool is not None:
+            read_pool.wrap_cursor = tracer.wrap
+        # A cached report would run no SQL at all, so reports skip the cache while traced
+        report_cache, self.report_manager.report_cache = self.report_manager.report_cache, None
+        
+        start = time.perf_counter()
+        try:
+            self.parse(cmd_str)
+        finally:
+            wall_time = time.perf_counter() - start
+            for manager, cursor in zip(managers, cursors):
+                manager.cursor = cursor
+            if read_pool is not None:
+                read_pool.wrap_cursor = None
+            self.report_manager.report_cache = report_cache
+        
+        tracer.report(wall_time)
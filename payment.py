@@ -1,9 +1,12 @@
 import sqlite3
+from dimension_cache import DimensionCache
 
 class PaymentManager:
-    def __init__(self, cursor, conn):
+    def __init__(self, cursor, conn, dimension_cache=None, report_cache=None):
         self.conn = conn
         self.cursor = cursor
+        self.dimension_cache = dimension_cache or DimensionCache(cursor)
+        self.report_cache = report_cache
     
     def add_payment_method(self, payment_method_name):
         payment_method_name = payment_method_name.strip().lower()
@@ -11,6 +14,9 @@ class PaymentManager:
         try:
             self.cursor.execute("INSERT INTO Payment_Method (payment_method_name) VALUES (?)", (payment_method_name,))
             self.conn.commit()
+            self.dimension_cache.add_payment_method(payment_method_name, self.cursor.lastrowid)
+            if self.report_cache is not None:
+                self.report_cache.bump()
             print(f"Payment Method '{payment_method_name}' added successfully.")
             return True
         except sqlite3.IntegrityError:
@@ -0,0 +1,83 @@
+import functools
+import queue
+import sqlite3
+from contextlib import contextmanager
+from sqlite_profile import apply_profile
+
+
+class ReadPool:
+    """A few read-only connections to the database for reports and listings.
+
+    Connections are opened with a mode=ro URI on first use and handed out one per
+    read. Readers never share the writers' connection, so they only see committed
+    data, and under WAL neither side waits for the other. When every pooled
+    connection is in use (a nested read), an extra one is opened and closed again
+    on release, so at most `size` stay idle. `wrap_cursor`, when set, is applied to
+    every cursor handed out; explain uses it to trace pooled reads.
+    """
+
+    def __init__(self, path, size=2, profile=None):
+        self.uri = f"file:{path}?mode=ro"
+        self.size = size
+        self.profile = profile
+        self.wrap_cursor = None
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        if self.profile:
+            apply_profile(conn.cursor(), self.profile, read_only=True)
+        return conn
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        self.opened += 1
+        try:
+            return self._connect()
+        except sqlite3.Error:
+            self.opened -= 1
+            raise
+
+    def release(self, conn):
+        if self.idle.qsize() >= self.size:
+            conn.close()
+            self.opened -= 1
+            return
+        self.idle.put(conn)
+
+    @contextmanager
+    def cursor(self):
+        conn = self.acquire()
+        cursor = conn.cursor()
+        try:
+            yield self.wrap_cursor(cursor) if self.wrap_cursor else cursor
+        finally:
+            cursor.close()
+            self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self.opened = 0
+
+
+def pooled_reads(method):
+    """Run a manager method with self.cursor on a pooled read-only connection, if it has a read_pool"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.read_pool is None:
+            return method(self, *args, **kwargs)
+        with self.read_pool.cursor() as cursor:
+            writer_cursor, self.cursor = self.cursor, cursor
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.cursor = writer_cursor
+    return wrapper
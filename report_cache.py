@@ -0,0 +1,85 @@
+from collections import OrderedDict
+
+
+class ReportCache:
+    """LRU cache of report query results, tagged with the data version they were read at.
+
+    Managers that write expenses, categories or payment methods call bump() after a
+    write; entries from an older version are dropped when next looked up. Given the
+    writer connection, the version also includes its PRAGMA data_version, which changes
+    when another process commits, such as an import running alongside this session.
+    The bound is on the total number of cached rows, so a few large results cannot hold memory.
+    """
+
+    def __init__(self, conn=None, max_rows=100000):
+        self.conn = conn
+        self.max_rows = max_rows
+        self.version = 0
+        self.entries = OrderedDict()  # key -> (version, rows)
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(rows):
+        return max(1, len(rows))
+
+    def _drop(self, key):
+        _, rows = self.entries.pop(key)
+        self.rows -= self._size(rows)
+
+    def bump(self):
+        self.version += 1
+
+    def current_version(self):
+        """This process's write counter and, with a connection, the database's data_version"""
+        if self.conn is None:
+            return self.version, None
+        return self.version, self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] != self.current_version():
+            self._drop(key)
+            self.stale += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, rows, version=None):
+        """Cache rows read at `version`, by default the current one"""
+        if self._size(rows) > self.max_rows:
+            return
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = (version or self.current_version(), rows)
+        self.rows += self._size(rows)
+        while self.rows > self.max_rows:
+            self._drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.rows = 0
+
+    def print_stats(self):
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups * 100 if lookups else 0.0
+        print("\nReport Cache:")
+        print("-" * 40)
+        print(f"{'Data version':<20} {self.version}")
+        if self.conn is not None:
+            print(f"{'Database version':<20} {self.current_version()[1]}")
+        print(f"{'Entries':<20} {len(self.entries)}")
+        print(f"{'Cached rows':<20} {self.rows} of {self.max_rows}")
+        print(f"{'Hits':<20} {self.hits}")
+        print(f"{'Misses':<20} {self.misses} ({self.stale} stale)")
+        print(f"{'Hit rate':<20} {hit_rate:.1f}%")
+        print(f"{'Evictions':<20} {self.evictions}")
+        print("-" * 40)
@@ -1,13 +1,19 @@
 import sqlite3
-import matplotlib.pyplot as plt
 from datetime import datetime
-import numpy as np
 import os
+from charts import ChartRenderer
+from filters import MONTHS, ROLLUP_FIELDS, compile_filters
+from read_pool import pooled_reads
+
+MONTH_NAMES = {number: name for name, number in MONTHS.items()}
 
 class ReportManager:
-    def __init__(self, cursor, conn):
+    def __init__(self, cursor, conn, read_pool=None, report_cache=None, renderer=None):
         self.conn = conn
         self.cursor = cursor
+        self.read_pool = read_pool
+        self.report_cache = report_cache
+        self.renderer = renderer or ChartRenderer()
         self.current_user = None
         self.privileges = None
     
@@ -15,6 +21,27 @@ class ReportManager:
         self.current_user = username
         self.privileges = privileges
     
+    def _fetchall(self, report, args, query, params=()):
+        """Rows of a report's query, from the report cache when the data has not changed since"""
+        key = (report, self.privileges, self.current_user, args)
+        if self.report_cache is not None:
+            # Taken before the query, so rows read while another process commits are not cached as current
+            version = self.report_cache.current_version()
+            rows = self.report_cache.get(key)
+            if rows is not None:
+                return rows
+        
+        self.cursor.execute(query, params)
+        rows = self.cursor.fetchall()
+        if self.report_cache is not None:
+            self.report_cache.put(key, rows, version)
+        return rows
+    
+    def _render(self, name, plot, *args):
+        """Draw a report's chart with plot(*args), shown or saved depending on the renderer"""
+        self.renderer.render(name, plot, *args)
+    
+    @pooled_reads
     def generate_report_top_expenses(self, n, start_date, end_date):
         """Report top N expenses for a given date range"""
         try:
@@ -34,15 +61,8 @@ class ReportManager:
             # Base query
             query = """
             SELECT e.expense_id, e.date, e.amount, e.description, 
-                c.category_name, t.tag_name, pm.payment_method_name, ue.username
-            FROM Expense e
-            LEFT JOIN category_expense ce ON e.expense_id = ce.expense_id
-            LEFT JOIN Categories c ON ce.category_id = c.category_id
-            LEFT JOIN tag_expense te ON e.expense_id = te.expense_id
-            LEFT JOIN Tags t ON te.tag_id = t.tag_id
-            LEFT JOIN payment_method_expense pme ON e.expense_id = pme.expense_id
-            LEFT JOIN Payment_Method pm ON pme.payment_method_id = pm.payment_method_id
-            LEFT JOIN user_expense ue ON e.expense_id = ue.expense_id
+                e.category_name, e.tag_name, e.payment_method_name, e.username
+            FROM expense_fact e
             WHERE e.date BETWEEN ? AND ?
             """
 
@@ -50,15 +70,14 @@ class ReportManager:
 
             # Apply user filtering for regular users
             if self.privileges != "admin":
-                query += " AND ue.username = ?"
+                query += " AND e.username = ?"
                 params.append(self.current_user)
 
             # Order by amount and limit results
             query += " ORDER BY e.amount DESC LIMIT ?"
             params.append(n)
 
-            self.cursor.execute(query, params)
-            expenses = self.cursor.fetchall()
+            expenses = self._fetchall("top_expenses", (n, start_date, end_date), query, params)
 
             if not expenses:
                 print(f"No expenses found between {start_date} and {end_date}")
@@ -99,46 +118,48 @@ class ReportManager:
             print(f"Total: {len(expenses)} expense(s) found. Total amount: {sum(expense[2] for expense in expenses):.2f}")
             
             # Create a line chart showing just expense amounts
-            if expenses:
-                plt.figure(figsize=(12, 6))
-                
-                # Extract data for plotting
-                ids = [str(exp[0]) for exp in expenses]
-                amounts = [exp[2] for exp in expenses]
-                
-                # Create line chart
-                plt.plot(ids, amounts, marker='o', linestyle='-', color='red', linewidth=2, markersize=8)
-                
-                # Add amount labels above each point
-                for i, amount in enumerate(amounts):
-                    plt.text(i, amount + (max(amounts) * 0.02), f'{amount:.2f}', 
-                            ha='center', va='bottom', fontsize=9)
-                
-                plt.xlabel('Expense ID')
-                plt.ylabel('Amount')
-                
-                # Add username information for admin users
-                if self.privileges == "admin":
-                    # Add username labels below each point
-                    usernames = [exp[7] or "N/A" for exp in expenses]
-                    plt.title(f'Top {n} Expenses - Line Chart (With User Info)')
-                    
-                    # Add custom x-tick labels with ID and username
-                    plt.xticks(range(len(ids)), [f"ID:{id}\n{user}" for id, user in zip(ids, usernames)], rotation=45)
-                else:
-                    plt.title(f'Top {n} Expenses - Line Chart')
-                    plt.xticks(rotation=45)
-                
-                plt.grid(True, linestyle='--', alpha=0.7)
-                plt.tight_layout()
-                
-                plt.show(block=False)  # Non-blocking display
-                plt.pause(0.001)  # Small pause to render the plot
+            self._render("top_expenses", self._plot_top_expenses, expenses, n, self.privileges == "admin")
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         except Exception as e:
             print(f"Error generating report: {e}")
 
+    def _plot_top_expenses(self, expenses, n, admin):
+        """Line chart of the top expenses' amounts"""
+        import matplotlib.pyplot as plt
+        plt.figure(figsize=(12, 6))
+        
+        # Extract data for plotting
+        ids = [str(exp[0]) for exp in expenses]
+        amounts = [exp[2] for exp in expenses]
+        
+        # Create line chart
+        plt.plot(ids, amounts, marker='o', linestyle='-', color='red', linewidth=2, markersize=8)
+        
+        # Add amount labels above each point
+        for i, amount in enumerate(amounts):
+            plt.text(i, amount + (max(amounts) * 0.02), f'{amount:.2f}', 
+                    ha='center', va='bottom', fontsize=9)
+        
+        plt.xlabel('Expense ID')
+        plt.ylabel('Amount')
+        
+        # Add username information for admin users
+        if admin:
+            # Add username labels below each point
+            usernames = [exp[7] or "N/A" for exp in expenses]
+            plt.title(f'Top {n} Expenses - Line Chart (With User Info)')
+        
+            # Add custom x-tick labels with ID and username
+            plt.xticks(range(len(ids)), [f"ID:{id}\n{user}" for id, user in zip(ids, usernames)], rotation=45)
+        else:
+            plt.title(f'Top {n} Expenses - Line Chart')
+            plt.xticks(rotation=45)
+        
+        plt.grid(True, linestyle='--', alpha=0.7)
+        plt.tight_layout()
+
+    @pooled_reads
     def generate_report_category_spending(self, category):
         """Report total spending for a specific category"""
         try:
@@ -208,100 +229,103 @@ class ReportManager:
                 percentage = (total / total_all_expenses * 100) if total_all_expenses > 0 else 0
                 
                 # Create a dashboard layout with multiple subplots
-                fig = plt.figure(figsize=(12, 8))
-                plt.suptitle(f'Dashboard: {category.capitalize()} Category', fontsize=16)
-                
-                # Grid spec for custom layout
-                gs = fig.add_gridspec(2, 3)
-                
-                # First subplot: Key Metrics display
-                ax1 = fig.add_subplot(gs[0, 0])
-                ax1.axis('off')  # No axes for text display
-                ax1.text(0.5, 0.9, f"Key Metrics", ha='center', fontsize=14, fontweight='bold')
-                ax1.text(0.5, 0.7, f"Total Spending: ${total:.2f}", ha='center')
-                ax1.text(0.5, 0.5, f"Number of Expenses: {count}", ha='center')
-                ax1.text(0.5, 0.3, f"Average Expense: ${avg_exp:.2f}", ha='center')
-                
-                # Second subplot: Value comparison bar chart
-                ax2 = fig.add_subplot(gs[0, 1:])
-                metrics = ['Total', 'Maximum', 'Minimum', 'Average']
-                values = [total, max_exp, min_exp, avg_exp]
-                colors = ['#3498db', '#e74c3c', '#2ecc71', '#f39c12']
-                bars = ax2.bar(metrics, values, color=colors)
-                ax2.set_title('Expense Values')
-                ax2.set_ylabel('Amount ($)')
-                
-                # Add value labels to the bars
-                for bar in bars:
-                    height = bar.get_height()
-                    ax2.annotate(f'${height:.2f}',
-                                xy=(bar.get_x() + bar.get_width() / 2, height),
-                                xytext=(0, 3),  # 3 points vertical offset
-                                textcoords="offset points",
-                                ha='center', va='bottom')
-                
-                # Third subplot: Pie chart showing proportion
-                ax3 = fig.add_subplot(gs[1, 0])
-                sizes = [total, total_all_expenses - total]
-                labels = [f'{category.capitalize()}\n(${total:.2f})', f'Other Categories\n(${total_all_expenses - total:.2f})']
-                colors = ['#3498db', '#e6e6e6']
-                explode = (0.1, 0)  # explode the first slice
-                
-                # Only create pie if there are other expenses
-                if total_all_expenses > 0:
-                    ax3.pie(sizes, explode=explode, labels=labels, colors=colors, autopct='%1.1f%%',
-                           shadow=True, startangle=90)
-                    ax3.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
-                    ax3.set_title('Proportion of Total Spending')
-                else:
-                    ax3.axis('off')
-                    ax3.text(0.5, 0.5, "No data for proportion", ha='center')
-                
-                # Fourth subplot: Gauge chart for percentage of total
-                ax4 = fig.add_subplot(gs[1, 1:])
-                gauge_colors = ['#f1c40f', '#e67e22', '#e74c3c']
-                
-                # Create a semi-circle gauge
-                theta = np.linspace(0, np.pi, 100)
-                r = 1.0
-                
-                # Draw the gauge background
-                for i, color in enumerate(gauge_colors):
-                    ax4.fill_between(theta, 0.8, 1.0, 
-                                    color=color, 
-                                    alpha=0.3,
-                                    where=((i/3)*np.pi <= theta) & (theta <= ((i+1)/3)*np.pi))
-                
-                # Draw the gauge needle
-                needle_theta = np.pi * min(percentage/100, 1.0)
-                ax4.plot([0, np.cos(needle_theta)], [0, np.sin(needle_theta)], 'k-', lw=2)
-                
-                # Add a center circle for gauge aesthetics
-                circle = plt.Circle((0, 0), 0.1, color='k', fill=True)
-                ax4.add_artist(circle)
-                
-                # Set gauge labels
-                ax4.text(-0.2, -0.15, '0%', fontsize=10)
-                ax4.text(1.1, -0.15, '100%', fontsize=10)
-                ax4.text(0.5, 0.5, f'{percentage:.1f}%', ha='center', fontsize=14)
-                
-                # Clean up gauge appearance
-                ax4.set_xlim(-1.1, 1.1)
-                ax4.set_ylim(-0.2, 1.1)
-                ax4.axis('off')
-                ax4.set_title('Percentage of Total Spending')
-                
-                plt.tight_layout()
-                plt.subplots_adjust(top=0.9)  # Adjust for main title
-                
-                # Display the dashboard
-                plt.show(block=False)  # Non-blocking display
-                plt.pause(0.001)  # Small pause to render the plot
+                self._render("category_spending", self._plot_category_spending, category, total, count, max_exp, min_exp, avg_exp, total_all_expenses, percentage)
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         except Exception as e:
             print(f"Error generating report: {e}")
 
+    def _plot_category_spending(self, category, total, count, max_exp, min_exp, avg_exp, total_all_expenses, percentage):
+        """Dashboard of one category's metrics and its share of all spending"""
+        import matplotlib.pyplot as plt
+        import numpy as np
+        fig = plt.figure(figsize=(12, 8))
+        plt.suptitle(f'Dashboard: {category.capitalize()} Category', fontsize=16)
+        
+        # Grid spec for custom layout
+        gs = fig.add_gridspec(2, 3)
+        
+        # First subplot: Key Metrics display
+        ax1 = fig.add_subplot(gs[0, 0])
+        ax1.axis('off')  # No axes for text display
+        ax1.text(0.5, 0.9, f"Key Metrics", ha='center', fontsize=14, fontweight='bold')
+        ax1.text(0.5, 0.7, f"Total Spending: ${total:.2f}", ha='center')
+        ax1.text(0.5, 0.5, f"Number of Expenses: {count}", ha='center')
+        ax1.text(0.5, 0.3, f"Average Expense: ${avg_exp:.2f}", ha='center')
+        
+        # Second subplot: Value comparison bar chart
+        ax2 = fig.add_subplot(gs[0, 1:])
+        metrics = ['Total', 'Maximum', 'Minimum', 'Average']
+        values = [total, max_exp, min_exp, avg_exp]
+        colors = ['#3498db', '#e74c3c', '#2ecc71', '#f39c12']
+        bars = ax2.bar(metrics, values, color=colors)
+        ax2.set_title('Expense Values')
+        ax2.set_ylabel('Amount ($)')
+        
+        # Add value labels to the bars
+        for bar in bars:
+            height = bar.get_height()
+            ax2.annotate(f'${height:.2f}',
+                        xy=(bar.get_x() + bar.get_width() / 2, height),
+                        xytext=(0, 3),  # 3 points vertical offset
+                        textcoords="offset points",
+                        ha='center', va='bottom')
+        
+        # Third subplot: Pie chart showing proportion
+        ax3 = fig.add_subplot(gs[1, 0])
+        sizes = [total, total_all_expenses - total]
+        labels = [f'{category.capitalize()}\n(${total:.2f})', f'Other Categories\n(${total_all_expenses - total:.2f})']
+        colors = ['#3498db', '#e6e6e6']
+        explode = (0.1, 0)  # explode the first slice
+        
+        # Only create pie if there are other expenses
+        if total_all_expenses > 0:
+            ax3.pie(sizes, explode=explode, labels=labels, colors=colors, autopct='%1.1f%%',
+                   shadow=True, startangle=90)
+            ax3.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
+            ax3.set_title('Proportion of Total Spending')
+        else:
+            ax3.axis('off')
+            ax3.text(0.5, 0.5, "No data for proportion", ha='center')
+        
+        # Fourth subplot: Gauge chart for percentage of total
+        ax4 = fig.add_subplot(gs[1, 1:])
+        gauge_colors = ['#f1c40f', '#e67e22', '#e74c3c']
+        
+        # Create a semi-circle gauge
+        theta = np.linspace(0, np.pi, 100)
+        r = 1.0
+        
+        # Draw the gauge background
+        for i, color in enumerate(gauge_colors):
+            ax4.fill_between(theta, 0.8, 1.0, 
+                            color=color, 
+                            alpha=0.3,
+                            where=((i/3)*np.pi <= theta) & (theta <= ((i+1)/3)*np.pi))
+        
+        # Draw the gauge needle
+        needle_theta = np.pi * min(percentage/100, 1.0)
+        ax4.plot([0, np.cos(needle_theta)], [0, np.sin(needle_theta)], 'k-', lw=2)
+        
+        # Add a center circle for gauge aesthetics
+        circle = plt.Circle((0, 0), 0.1, color='k', fill=True)
+        ax4.add_artist(circle)
+        
+        # Set gauge labels
+        ax4.text(-0.2, -0.15, '0%', fontsize=10)
+        ax4.text(1.1, -0.15, '100%', fontsize=10)
+        ax4.text(0.5, 0.5, f'{percentage:.1f}%', ha='center', fontsize=14)
+        
+        # Clean up gauge appearance
+        ax4.set_xlim(-1.1, 1.1)
+        ax4.set_ylim(-0.2, 1.1)
+        ax4.axis('off')
+        ax4.set_title('Percentage of Total Spending')
+        
+        plt.tight_layout()
+        plt.subplots_adjust(top=0.9)  # Adjust for main title
+
+    @pooled_reads
     def generate_report_payment_method_details_expense(self):
         """Report on expenses with payment method details - analyzing frequency, total, and average amounts"""
         try:
@@ -323,8 +347,7 @@ class ReportManager:
             
             
             params = [self.current_user]
-            self.cursor.execute(query, params)
-            results = self.cursor.fetchall()
+            results = self._fetchall("payment_method_details_expense", (), query, params)
             
             if not results:
                 print("No expenses with payment method details found.")
@@ -356,96 +379,96 @@ class ReportManager:
             print(f"Overall Total: {total_transactions} transactions, ${total_amount:.2f}")
             print(f"Overall Average: ${total_amount/total_transactions:.2f} per transaction")
             
-            # Create visualizations if we have data
-            if results:
-                import matplotlib.pyplot as plt
-                import numpy as np
-                from matplotlib.ticker import FuncFormatter
-                
-                # Prepare data for plotting
-                details = [self._mask_payment_details(r[0]) if r[4][-4:] == "card" else r[0] for r in results]
-                counts = [r[1] for r in results]
-                totals = [r[2] for r in results]
-                avgs = [r[3] for r in results]
-                methods = [r[4] for r in results]
-                
-                # If too many details, limit to top 10 for readability
-                if len(details) > 10:
-                    details = details[:10]
-                    counts = counts[:10]
-                    totals = totals[:10]
-                    avgs = avgs[:10]
-                    methods = methods[:10]
-                
-                # Create figure with 3 subplots (removed 4th plot)
-                fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(15, 6))
-                
-                # 1. Bar chart showing frequency of usage
-                bars1 = ax1.bar(details, counts, color='skyblue')
-                ax1.set_title('Frequency of Usage')
-                ax1.set_xlabel('Payment Detail (masked)')
-                ax1.set_ylabel('Number of Transactions')
-                ax1.tick_params(axis='x', rotation=45)
-                
-                # Add count labels with slanted text
-                for bar in bars1:
-                    height = bar.get_height()
-                    ax1.annotate(f'{height}',
-                                xy=(bar.get_x() + bar.get_width() / 2, height),
-                                xytext=(0, 3),
-                                textcoords="offset points",
-                                ha='center', va='bottom',
-                                rotation=45)
-                
-                # 2. Bar chart showing total amount spent
-                bars2 = ax2.bar(details, totals, color='lightgreen')
-                ax2.set_title('Total Amount Spent')
-                ax2.set_xlabel('Payment Detail (masked)')
-                ax2.set_ylabel('Total Amount ($)')
-                ax2.tick_params(axis='x', rotation=45)
-                
-                # Format y-axis as currency
-                ax2.yaxis.set_major_formatter(FuncFormatter(lambda x, _: f'${x:.0f}'))
-                
-                # Add amount labels with slanted text
-                for bar in bars2:
-                    height = bar.get_height()
-                    ax2.annotate(f'${height:.2f}',
-                                xy=(bar.get_x() + bar.get_width() / 2, height),
-                                xytext=(0, 3),
-                                textcoords="offset points",
-                                ha='center', va='bottom',
-                                rotation=45)
-                
-                # 3. Bar chart showing average transaction amount
-                bars3 = ax3.bar(details, avgs, color='salmon')
-                ax3.set_title('Average Transaction Amount')
-                ax3.set_xlabel('Payment Detail (masked)')
-                ax3.set_ylabel('Average Amount ($)')
-                ax3.tick_params(axis='x', rotation=45)
-                
-                # Format y-axis as currency
-                ax3.yaxis.set_major_formatter(FuncFormatter(lambda x, _: f'${x:.0f}'))
-                
-                # Add amount labels with slanted text
-                for bar in bars3:
-                    height = bar.get_height()
-                    ax3.annotate(f'${height:.2f}',
-                                xy=(bar.get_x() + bar.get_width() / 2, height),
-                                xytext=(0, 3),
-                                textcoords="offset points",
-                                ha='center', va='bottom',
-                                rotation=45)
-                
-                plt.tight_layout()
-                plt.suptitle('Payment Method Details Analysis', fontsize=16, y=1.05)
-                
-                plt.show(block=False)
-                plt.pause(0.001)
+            # Create visualizations
+            self._render("payment_method_details_expense", self._plot_payment_method_details_expense, results)
                 
         except Exception as e:
             print(f"Error generating report: {e}")
 
+    def _plot_payment_method_details_expense(self, results):
+        """Usage, total and average per payment detail, top 10"""
+        import matplotlib.pyplot as plt
+        import numpy as np
+        from matplotlib.ticker import FuncFormatter
+        
+        # Prepare data for plotting
+        details = [self._mask_payment_details(r[0]) if r[4][-4:] == "card" else r[0] for r in results]
+        counts = [r[1] for r in results]
+        totals = [r[2] for r in results]
+        avgs = [r[3] for r in results]
+        methods = [r[4] for r in results]
+        
+        # If too many details, limit to top 10 for readability
+        if len(details) > 10:
+            details = details[:10]
+            counts = counts[:10]
+            totals = totals[:10]
+            avgs = avgs[:10]
+            methods = methods[:10]
+        
+        # Create figure with 3 subplots (removed 4th plot)
+        fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(15, 6))
+        
+        # 1. Bar chart showing frequency of usage
+        bars1 = ax1.bar(details, counts, color='skyblue')
+        ax1.set_title('Frequency of Usage')
+        ax1.set_xlabel('Payment Detail (masked)')
+        ax1.set_ylabel('Number of Transactions')
+        ax1.tick_params(axis='x', rotation=45)
+        
+        # Add count labels with slanted text
+        for bar in bars1:
+            height = bar.get_height()
+            ax1.annotate(f'{height}',
+                        xy=(bar.get_x() + bar.get_width() / 2, height),
+                        xytext=(0, 3),
+                        textcoords="offset points",
+                        ha='center', va='bottom',
+                        rotation=45)
+        
+        # 2. Bar chart showing total amount spent
+        bars2 = ax2.bar(details, totals, color='lightgreen')
+        ax2.set_title('Total Amount Spent')
+        ax2.set_xlabel('Payment Detail (masked)')
+        ax2.set_ylabel('Total Amount ($)')
+        ax2.tick_params(axis='x', rotation=45)
+        
+        # Format y-axis as currency
+        ax2.yaxis.set_major_formatter(FuncFormatter(lambda x, _: f'${x:.0f}'))
+        
+        # Add amount labels with slanted text
+        for bar in bars2:
+            height = bar.get_height()
+            ax2.annotate(f'${height:.2f}',
+                        xy=(bar.get_x() + bar.get_width() / 2, height),
+                        xytext=(0, 3),
+                        textcoords="offset points",
+                        ha='center', va='bottom',
+                        rotation=45)
+        
+        # 3. Bar chart showing average transaction amount
+        bars3 = ax3.bar(details, avgs, color='salmon')
+        ax3.set_title('Average Transaction Amount')
+        ax3.set_xlabel('Payment Detail (masked)')
+        ax3.set_ylabel('Average Amount ($)')
+        ax3.tick_params(axis='x', rotation=45)
+        
+        # Format y-axis as currency
+        ax3.yaxis.set_major_formatter(FuncFormatter(lambda x, _: f'${x:.0f}'))
+        
+        # Add amount labels with slanted text
+        for bar in bars3:
+            height = bar.get_height()
+            ax3.annotate(f'${height:.2f}',
+                        xy=(bar.get_x() + bar.get_width() / 2, height),
+                        xytext=(0, 3),
+                        textcoords="offset points",
+                        ha='center', va='bottom',
+                        rotation=45)
+        
+        plt.tight_layout()
+        plt.suptitle('Payment Method Details Analysis', fontsize=16, y=1.05)
+
     def _mask_payment_details(self, details):
         """Mask payment method details for privacy"""
         if not details:
@@ -457,6 +480,7 @@ class ReportManager:
         else:
             return details[0:2] + '*' * (len(details) - 4) + details[-2:]
     
+    @pooled_reads
     def generate_report_payment_method_usage(self):
         """Report spending breakdown by payment method"""
             
@@ -479,8 +503,7 @@ class ReportManager:
             query += """GROUP BY pm.payment_method_name
             ORDER BY total_amount DESC"""
                         
-            self.cursor.execute(query, params)
-            results = self.cursor.fetchall()
+            results = self._fetchall("payment_method_usage", (), query, params)
             
             if not results:
                 print("No payment method usage data available.")
@@ -499,27 +522,29 @@ class ReportManager:
             print("-" * 60)
             
             # Create a pie chart
-            if results:
-                plt.figure(figsize=(10, 8))
-                
-                # Extract data for plotting
-                methods = [result[0] for result in results]
-                amounts = [result[2] for result in results]
-                
-                # Create pie chart
-                plt.pie(amounts, labels=methods, autopct='%1.1f%%', startangle=90, shadow=True)
-                plt.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
-                plt.title('Spending by Payment Method')
-                plt.tight_layout()
-                
-                plt.show(block=False)
-                plt.pause(0.001)
+            self._render("payment_method_usage", self._plot_payment_method_usage, results)
                 
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         except Exception as e:
             print(f"Error generating report: {e}")
     
+    def _plot_payment_method_usage(self, results):
+        """Pie chart of spending by payment method"""
+        import matplotlib.pyplot as plt
+        plt.figure(figsize=(10, 8))
+        
+        # Extract data for plotting
+        methods = [result[0] for result in results]
+        amounts = [result[2] for result in results]
+        
+        # Create pie chart
+        plt.pie(amounts, labels=methods, autopct='%1.1f%%', startangle=90, shadow=True)
+        plt.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
+        plt.title('Spending by Payment Method')
+        plt.tight_layout()
+
+    @pooled_reads
     def generate_report_frequent_category(self):
         """Report the most frequently used expense category"""
         try:
@@ -541,8 +566,7 @@ class ReportManager:
                 
             query += " GROUP BY c.category_name ORDER BY usage_count DESC"
             
-            self.cursor.execute(query, params)
-            results = self.cursor.fetchall()
+            results = self._fetchall("frequent_category", (), query, params)
             
             if not results:
                 print("No expenses found to generate frequent category report.")
@@ -562,36 +586,38 @@ class ReportManager:
             print(f"Most frequently used category: {results[0][0]} ({results[0][1]} uses)")
             
             # Create a horizontal bar chart
-            if len(results) > 0:
-                plt.figure(figsize=(10, max(6, len(results) * 0.4)))
-                
-                # Extract data for plotting
-                categories = [result[0] for result in results]
-                counts = [result[1] for result in results]
-                
-                # Sort data for better visualization
-                categories.reverse()
-                counts.reverse()
-                
-                # Create horizontal bar chart
-                bars = plt.barh(categories, counts, color='purple')
-                
-                # Add count labels
-                for i, v in enumerate(counts):
-                    plt.text(v + 0.5, i, str(v), va='center')
-                
-                plt.xlabel('Usage Count')
-                plt.title('Category Usage Frequency')
-                plt.tight_layout()
-                
-                plt.show(block=False)
-                plt.pause(0.001)
+            self._render("frequent_category", self._plot_frequent_category, results)
                 
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         except Exception as e:
             print(f"Error generating report: {e}")
 
+    def _plot_frequent_category(self, results):
+        """Horizontal bar chart of category usage counts"""
+        import matplotlib.pyplot as plt
+        plt.figure(figsize=(10, max(6, len(results) * 0.4)))
+        
+        # Extract data for plotting
+        categories = [result[0] for result in results]
+        counts = [result[1] for result in results]
+        
+        # Sort data for better visualization
+        categories.reverse()
+        counts.reverse()
+        
+        # Create horizontal bar chart
+        bars = plt.barh(categories, counts, color='purple')
+        
+        # Add count labels
+        for i, v in enumerate(counts):
+            plt.text(v + 0.5, i, str(v), va='center')
+        
+        plt.xlabel('Usage Count')
+        plt.title('Category Usage Frequency')
+        plt.tight_layout()
+
+    @pooled_reads
     def generate_report_highest_spender_per_month(self):
         """Report the user with highest spending for each month (admin only)"""
         if self.privileges != "admin":
@@ -602,12 +628,12 @@ class ReportManager:
             query = """
             WITH MonthlyUserSpending AS (
                 SELECT 
-                    strftime('%Y-%m', e.date) as month,
-                    ue.username,
-                    SUM(e.amount) as total_spending
-                FROM Expense e
-                JOIN user_expense ue ON e.expense_id = ue.expense_id
-                GROUP BY month, ue.username
+                    CASE WHEN m.year IS NULL THEN NULL ELSE printf('%04d-%02d', m.year, m.month) END as month,
+                    m.username,
+                    SUM(m.total_amount) as total_spending
+                FROM expense_monthly m
+                WHERE m.username IS NOT NULL
+                GROUP BY m.month, m.year, m.username
             ),
             RankedSpending AS (
                 SELECT 
@@ -626,8 +652,7 @@ class ReportManager:
             ORDER BY month
             """
             
-            self.cursor.execute(query)
-            results = self.cursor.fetchall()
+            results = self._fetchall("highest_spender_per_month", (), query, ())
             
             if not results:
                 print("No data available to generate highest spender report.")
@@ -645,122 +670,124 @@ class ReportManager:
             print("-" * 50)
             
             # Create enhanced visualization
-            plt.figure(figsize=(14, 8))
-            
-            # Extract data for plotting
-            months = [result[0] for result in results]
-            amounts = [result[2] for result in results]
-            usernames = [result[1] for result in results]
-            
-            # Create a custom colormap with gradient for visual appeal
-            unique_users = list(set(usernames))
-            cmap = plt.cm.viridis
-            colors = cmap(np.linspace(0.1, 0.9, len(unique_users)))
-            user_colors = {user: colors[i] for i, user in enumerate(unique_users)}
-            
-            # Plot the bars with enhanced styling
-            bars = plt.bar(
-                months, 
-                amounts, 
-                color=[user_colors[user] for user in usernames],
-                width=0.6,
-                edgecolor='white',
-                linewidth=1.5,
-                alpha=0.8
-            )
-            
-            # Add annotations for each bar
-            for bar, username, amount in zip(bars, usernames, amounts):
-                # Username at the top of the bar
-                plt.text(
-                    bar.get_x() + bar.get_width()/2, 
-                    bar.get_height() + (max(amounts) * 0.03), 
-                    username,
-                    ha='center',
-                    fontsize=10,
-                    fontweight='bold'
-                )
-                
-                # Amount inside the bar
-                plt.text(
-                    bar.get_x() + bar.get_width()/2,
-                    bar.get_height()/2,
-                    f'${amount:.2f}',
-                    ha='center',
-                    va='center',
-                    fontsize=9,
-                    fontweight='bold',
-                    color='white'
-                )
-            
-            # Enhance the plot styling
-            plt.xlabel('Month', fontsize=12, fontweight='bold')
-            plt.ylabel('Total Spending ($)', fontsize=12, fontweight='bold')
-            plt.title('Highest Spender Per Month', fontsize=16, fontweight='bold', pad=20)
-            
-            # Add a subtle grid for easier reading
-            plt.grid(axis='y', linestyle='--', alpha=0.3)
-            
-            # Style the axis
-            plt.xticks(rotation=45, fontsize=10)
-            plt.yticks(fontsize=10)
-            
-            # Create legend for users
-            from matplotlib.patches import Patch
-            legend_elements = [Patch(facecolor=user_colors[user], label=user, edgecolor='white', linewidth=1) 
-                              for user in unique_users]
-            plt.legend(
-                handles=legend_elements, 
-                title="Users", 
-                title_fontsize=12,
-                loc='upper right',
-                frameon=True,
-                framealpha=0.95,
-                edgecolor='lightgray'
-            )
-            
-            # Add a note about the data
-            plt.figtext(
-                0.5, 0.01, 
-                "Note: Shows only the top spender for each month", 
-                ha='center', fontsize=9, fontstyle='italic'
-            )
-            
-            plt.tight_layout()
-            plt.show(block=False)
-            plt.pause(0.001)
+            self._render("highest_spender_per_month", self._plot_highest_spender_per_month, results)
                 
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         except Exception as e:
             print(f"Error generating report: {e}")
     
+    def _plot_highest_spender_per_month(self, results):
+        """Bar per month for its highest spender, coloured by user"""
+        import matplotlib.pyplot as plt
+        import numpy as np
+        plt.figure(figsize=(14, 8))
+        
+        # Extract data for plotting
+        months = [result[0] for result in results]
+        amounts = [result[2] for result in results]
+        usernames = [result[1] for result in results]
+        
+        # Create a custom colormap with gradient for visual appeal
+        unique_users = list(set(usernames))
+        cmap = plt.cm.viridis
+        colors = cmap(np.linspace(0.1, 0.9, len(unique_users)))
+        user_colors = {user: colors[i] for i, user in enumerate(unique_users)}
+        
+        # Plot the bars with enhanced styling
+        bars = plt.bar(
+            months, 
+            amounts, 
+            color=[user_colors[user] for user in usernames],
+            width=0.6,
+            edgecolor='white',
+            linewidth=1.5,
+            alpha=0.8
+        )
+        
+        # Add annotations for each bar
+        for bar, username, amount in zip(bars, usernames, amounts):
+            # Username at the top of the bar
+            plt.text(
+                bar.get_x() + bar.get_width()/2, 
+                bar.get_height() + (max(amounts) * 0.03), 
+                username,
+                ha='center',
+                fontsize=10,
+                fontweight='bold'
+            )
+        
+            # Amount inside the bar
+            plt.text(
+                bar.get_x() + bar.get_width()/2,
+                bar.get_height()/2,
+                f'${amount:.2f}',
+                ha='center',
+                va='center',
+                fontsize=9,
+                fontweight='bold',
+                color='white'
+            )
+        
+        # Enhance the plot styling
+        plt.xlabel('Month', fontsize=12, fontweight='bold')
+        plt.ylabel('Total Spending ($)', fontsize=12, fontweight='bold')
+        plt.title('Highest Spender Per Month', fontsize=16, fontweight='bold', pad=20)
+        
+        # Add a subtle grid for easier reading
+        plt.grid(axis='y', linestyle='--', alpha=0.3)
+        
+        # Style the axis
+        plt.xticks(rotation=45, fontsize=10)
+        plt.yticks(fontsize=10)
+        
+        # Create legend for users
+        from matplotlib.patches import Patch
+        legend_elements = [Patch(facecolor=user_colors[user], label=user, edgecolor='white', linewidth=1) 
+                          for user in unique_users]
+        plt.legend(
+            handles=legend_elements, 
+            title="Users", 
+            title_fontsize=12,
+            loc='upper right',
+            frameon=True,
+            framealpha=0.95,
+            edgecolor='lightgray'
+        )
+        
+        # Add a note about the data
+        plt.figtext(
+            0.5, 0.01, 
+            "Note: Shows only the top spender for each month", 
+            ha='center', fontsize=9, fontstyle='italic'
+        )
+        
+        plt.tight_layout()
+
+    @pooled_reads
     def generate_report_monthly_category_spending(self):
         """Report total spending per category for each month"""
         try:
             # Base query
             query = """
-            SELECT strftime('%Y-%m', e.date) as month, 
-                   c.category_name, 
-                   SUM(e.amount) as total,
-                   COUNT(e.expense_id) as count
-            FROM Expense e
-            JOIN category_expense ce ON e.expense_id = ce.expense_id
-            JOIN Categories c ON ce.category_id = c.category_id
-            JOIN user_expense ue ON e.expense_id = ue.expense_id
+            SELECT CASE WHEN m.year IS NULL THEN NULL ELSE printf('%04d-%02d', m.year, m.month) END as month, 
+                   m.category_name, 
+                   SUM(m.total_amount) as total,
+                   SUM(m.expense_count) as count
+            FROM expense_monthly m
+            WHERE m.category_name IS NOT NULL AND m.username IS NOT NULL
             """
             
             params = []
             
             # Apply user filtering for regular users
             if self.privileges != "admin":
-                query += " WHERE ue.username = ?"
+                query += " AND m.username = ?"
                 params.append(self.current_user)
                 
-            query += " GROUP BY month, c.category_name ORDER BY month, total DESC"
+            query += " GROUP BY m.month, m.year, m.category_name ORDER BY month, total DESC"
             
-            self.cursor.execute(query, params)
-            results = self.cursor.fetchall()
+            results = self._fetchall("monthly_category_spending", (), query, params)
             
             if not results:
                 print("No expenses found to generate monthly category spending report.")
@@ -792,36 +819,7 @@ class ReportManager:
                 print(f"Month Total: {month_total:.2f}")
                 
             # Create a stacked bar chart
-            plt.figure(figsize=(14, 8))
-            
-            # Get unique months and categories
-            all_months = sorted(months.keys())
-            all_categories = sorted(set(category for month_data in months.values() 
-                                   for category, _, _ in month_data))
-            
-            # Create data structure for plotting
-            data = {}
-            for category in all_categories:
-                data[category] = []
-                for month in all_months:
-                    amount = next((total for cat, total, _ in months[month] if cat == category), 0)
-                    data[category].append(amount)
-            
-            # Create the stacked bar chart
-            bottom = np.zeros(len(all_months))
-            for category in all_categories:
-                plt.bar(all_months, data[category], bottom=bottom, label=category)
-                bottom += np.array(data[category])
-            
-            plt.xlabel('Month')
-            plt.ylabel('Amount')
-            plt.title('Monthly Spending by Category')
-            plt.legend(title='Categories', bbox_to_anchor=(1.05, 1), loc='upper left')
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            
-            plt.show(block=False)
-            plt.pause(0.001)
+            self._render("monthly_category_spending", self._plot_monthly_category_spending, months)
             
         except sqlite3.Error as e:
             print(f"Database error: {e}")
@@ -829,76 +827,95 @@ class ReportManager:
             print(f"Error generating report: {e}")
     
     
-    def generate_report_above_average_expenses(self):
-        """Report expenses that are above the category average, grouped by category"""
+    def _plot_monthly_category_spending(self, months):
+        """Stacked bar chart of each month's spending by category"""
+        import matplotlib.pyplot as plt
+        import numpy as np
+        plt.figure(figsize=(14, 8))
+        
+        # Get unique months and categories
+        all_months = sorted(months.keys())
+        all_categories = sorted(set(category for month_data in months.values() 
+                               for category, _, _ in month_data))
+        
+        # Create data structure for plotting
+        data = {}
+        for category in all_categories:
+            data[category] = []
+            for month in all_months:
+                amount = next((total for cat, total, _ in months[month] if cat == category), 0)
+                data[category].append(amount)
+        
+        # Create the stacked bar chart
+        bottom = np.zeros(len(all_months))
+        for category in all_categories:
+            plt.bar(all_months, data[category], bottom=bottom, label=category)
+            bottom += np.array(data[category])
+        
+        plt.xlabel('Month')
+        plt.ylabel('Amount')
+        plt.title('Monthly Spending by Category')
+        plt.legend(title='Categories', bbox_to_anchor=(1.05, 1), loc='upper left')
+        plt.xticks(rotation=45)
+        plt.tight_layout()
+
+    @pooled_reads
+    def generate_report_above_average_expenses(self, top=None):
+        """Report expenses that are above the category average, grouped by category.
+
+        One scan of expense_fact: the averages are window aggregates over each category.
+        With `top` only the K largest above-average expenses per category are shown.
+        """
         try:
-            # Subquery to get category averages - keep this part the same
+            # The window runs over narrow rows an index covers; only rows above the average are joined back
             query = """
-            WITH CategoryAverages AS (
-                SELECT ce.category_id, c.category_name, AVG(e.amount) as avg_amount
-                FROM category_expense ce
-                JOIN Expense e ON ce.expense_id = e.expense_id
-                JOIN Categories c ON ce.category_id = c.category_id
-                JOIN user_expense ue ON e.expense_id = ue.expense_id
+            SELECT e.expense_id, e.date, e.amount, e.description, e.category_name, w.avg_amount,
+                   e.tag_name, e.payment_method_name, e.username,
+                   (e.amount - w.avg_amount) * 100.0 / w.avg_amount AS percentage_diff
+            FROM (
+                SELECT expense_id, amount,
+                       AVG(amount) OVER (PARTITION BY category_name) AS avg_amount
             """
             
             params = []
             
+            # Ranking costs a second sort, so only when asked for
+            if top is not None:
+                query += ", ROW_NUMBER() OVER (PARTITION BY category_name ORDER BY amount DESC, expense_id) AS amount_rank"
+                
+            query += """
+                FROM expense_fact
+                WHERE category_name IS NOT NULL AND username IS NOT NULL
+            """
+            
             # Apply user filtering for regular users
             if self.privileges != "admin":
-                query += " WHERE ue.username = ?"
+                query += " AND username = ?"
                 params.append(self.current_user)
                 
             query += """
-                GROUP BY ce.category_id
-            )
-            SELECT e.expense_id, e.date, e.amount, e.description, 
-                   c.category_name, ca.avg_amount, t.tag_name, 
-                   pm.payment_method_name, ue.username
-            FROM Expense e
-            JOIN category_expense ce ON e.expense_id = ce.expense_id
-            JOIN Categories c ON ce.category_id = c.category_id
-            JOIN CategoryAverages ca ON ce.category_id = ca.category_id
-            LEFT JOIN tag_expense te ON e.expense_id = te.expense_id
-            LEFT JOIN Tags t ON te.tag_id = t.tag_id
-            LEFT JOIN payment_method_expense pme ON e.expense_id = pme.expense_id
-            LEFT JOIN Payment_Method pm ON pme.payment_method_id = pm.payment_method_id
-            JOIN user_expense ue ON e.expense_id = ue.expense_id
-            WHERE e.amount > ca.avg_amount
+            ) w
+            JOIN expense_fact e ON e.expense_id = w.expense_id
+            WHERE w.amount > w.avg_amount
             """
             
-            # Additional filtering for regular users
-            if self.privileges != "admin":
-                query += " AND ue.username = ?"
-                params.append(self.current_user)
+            # Above-average rows rank first in their category, so the top K by amount are the top K above it
+            if top is not None:
+                query += " AND w.amount_rank <= ?"
+                params.append(top)
                 
-            # No ORDER BY in main query - we'll sort by category and diff% later
+            query += " ORDER BY e.category_name, percentage_diff DESC, e.expense_id"
             
-            self.cursor.execute(query, params)
-            expenses = self.cursor.fetchall()
+            expenses = self._fetchall("above_average_expenses", (top,), query, params)
             
             if not expenses:
                 print("No above-average expenses found.")
                 return
             
-            # Organize results by category
+            # Organize results by category; rows arrive sorted by diff % within each one
             category_expenses = {}
-            
             for expense in expenses:
-                expense_id, date, amount, description, category, avg_amount, tag, payment_method, username = expense
-                # Calculate percentage difference
-                percentage_diff = ((amount - avg_amount) / avg_amount) * 100
-                
-                # Add percentage diff to the expense data
-                expense_with_diff = expense + (percentage_diff,)
-                
-                if category not in category_expenses:
-                    category_expenses[category] = []
-                category_expenses[category].append(expense_with_diff)
-            
-            # Sort each category's expenses by percentage diff (descending)
-            for category in category_expenses:
-                category_expenses[category].sort(key=lambda x: x[9], reverse=True)
+                category_expenses.setdefault(expense[4], []).append(expense)
             
             # Display results by category
             print("\nExpenses Above Category Average (By Category):")
@@ -944,78 +961,83 @@ class ReportManager:
             print(f"Categories with above-average expenses: {len(category_expenses)}")
             
             # Create visualization showing expenses by category
-            if category_expenses:
-                plt.figure(figsize=(14, 10))
-                
-                # Create a scatter plot with categories on x-axis
-                all_categories = list(category_expenses.keys())
-                category_indices = {cat: i for i, cat in enumerate(all_categories)}
-                
-                # Plot points for each expense
-                x_values = []
-                y_values = []
-                sizes = []
-                colors = []
-                annotations = []
-                
-                # Color map for percentage differences
-                cmap = plt.cm.get_cmap('RdYlGn_r')
-                
-                for cat, expenses in category_expenses.items():
-                    cat_idx = category_indices[cat]
-                    for exp in expenses:
-                        amount = exp[2]
-                        avg = exp[5]
-                        diff_pct = exp[9]
-                        
-                        # Add jitter to x position to avoid overlapping points
-                        jitter = (np.random.random() - 0.5) * 0.3
-                        x_values.append(cat_idx + jitter)
-                        y_values.append(amount)
-                        
-                        # Size based on amount
-                        sizes.append(50 + (amount/max(exp[2] for exp in expenses)) * 100)
-                        
-                        # Color based on percentage difference (normalize to 0-1 range)
-                        norm_diff = min(1.0, diff_pct / 200)  # Cap at 200% difference
-                        colors.append(cmap(norm_diff))
-                        
-                        # Annotation with expense ID and diff%
-                        annotations.append(f"ID:{exp[0]}\n+{diff_pct:.1f}%")
-                
-                # Draw scatter plot
-                scatter = plt.scatter(x_values, y_values, s=sizes, c=colors, alpha=0.7)
-                
-                # Draw category average lines
-                for cat, expenses in category_expenses.items():
-                    cat_idx = category_indices[cat]
-                    avg = expenses[0][5]  # All expenses in a category have the same average
-                    plt.hlines(avg, cat_idx - 0.4, cat_idx + 0.4, colors='blue', linestyles='dashed', 
-                               label='Category Average' if cat == list(category_expenses.keys())[0] else "")
-                
-                # Add hover annotations
-                from matplotlib.offsetbox import OffsetImage, AnnotationBbox
-                
-                # Label axes and title
-                plt.xlabel('Category')
-                plt.ylabel('Amount')
-                plt.title('Above-Average Expenses by Category')
-                plt.xticks(range(len(all_categories)), all_categories)
-                plt.grid(True, linestyle='--', alpha=0.3)
-                
-                # Add legend
-                plt.colorbar(scatter, label='Percentage Above Average')
-                plt.legend()
-                
-                # Display the plot
-                plt.tight_layout()
-                plt.show()
+            self._render("above_average_expenses", self._plot_above_average_expenses, category_expenses)
                 
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         except Exception as e:
             print(f"Error generating report: {e}")
 
+    def _plot_above_average_expenses(self, category_expenses):
+        """Scatter of above-average expenses against their category averages"""
+        import matplotlib.pyplot as plt
+        import numpy as np
+        plt.figure(figsize=(14, 10))
+        
+        # Create a scatter plot with categories on x-axis
+        all_categories = list(category_expenses.keys())
+        category_indices = {cat: i for i, cat in enumerate(all_categories)}
+        
+        # Plot points for each expense
+        x_values = []
+        y_values = []
+        sizes = []
+        colors = []
+        annotations = []
+        
+        # Color map for percentage differences
+        cmap = plt.get_cmap('RdYlGn_r')
+        
+        for cat, expenses in category_expenses.items():
+            cat_idx = category_indices[cat]
+            max_amount = expenses[0][2]  # Sorted by diff %, so the first is the largest
+            for exp in expenses:
+                amount = exp[2]
+                avg = exp[5]
+                diff_pct = exp[9]
+        
+                # Add jitter to x position to avoid overlapping points
+                jitter = (np.random.random() - 0.5) * 0.3
+                x_values.append(cat_idx + jitter)
+                y_values.append(amount)
+        
+                # Size based on amount
+                sizes.append(50 + (amount / max_amount) * 100)
+        
+                # Color based on percentage difference (normalize to 0-1 range)
+                norm_diff = min(1.0, diff_pct / 200)  # Cap at 200% difference
+                colors.append(cmap(norm_diff))
+        
+                # Annotation with expense ID and diff%
+                annotations.append(f"ID:{exp[0]}\n+{diff_pct:.1f}%")
+        
+        # Draw scatter plot
+        scatter = plt.scatter(x_values, y_values, s=sizes, c=colors, alpha=0.7)
+        
+        # Draw category average lines
+        for cat, expenses in category_expenses.items():
+            cat_idx = category_indices[cat]
+            avg = expenses[0][5]  # All expenses in a category have the same average
+            plt.hlines(avg, cat_idx - 0.4, cat_idx + 0.4, colors='blue', linestyles='dashed', 
+                       label='Category Average' if cat == list(category_expenses.keys())[0] else "")
+        
+        # Add hover annotations
+        from matplotlib.offsetbox import OffsetImage, AnnotationBbox
+        
+        # Label axes and title
+        plt.xlabel('Category')
+        plt.ylabel('Amount')
+        plt.title('Above-Average Expenses by Category')
+        plt.xticks(range(len(all_categories)), all_categories)
+        plt.grid(True, linestyle='--', alpha=0.3)
+        
+        # Add legend
+        plt.colorbar(scatter, label='Percentage Above Average')
+        plt.legend()
+        
+        plt.tight_layout()
+
+    @pooled_reads
     def generate_report_tag_expenses(self):
         """Report number of expenses for each tag"""
         try:
@@ -1037,8 +1059,7 @@ class ReportManager:
                 
             query += " GROUP BY t.tag_name ORDER BY usage_count DESC"
             
-            self.cursor.execute(query, params)
-            results = self.cursor.fetchall()
+            results = self._fetchall("tag_expenses", (), query, params)
             
             if not results:
                 print("No tag usage data available.")
@@ -1057,385 +1078,335 @@ class ReportManager:
             print("-" * 60)
             
             # Create a horizontal bar chart for counts
-            if results:
-                # Create figure with single plot
-                plt.figure(figsize=(10, 8))
-                
-                # Extract data for plotting
-                tags = [result[0] for result in results]
-                counts = [result[1] for result in results]
-                amounts = [result[2] for result in results]
-                
-                # Sort data by count for better visualization
-                sorted_data = sorted(zip(tags, counts, amounts), key=lambda x: x[1])
-                tags = [x[0] for x in sorted_data]
-                counts = [x[1] for x in sorted_data]
-                
-                # Bar chart for usage count
-                plt.barh(tags, counts, color='teal')
-                plt.xlabel('Usage Count')
-                plt.title('Tag Usage Frequency')
-                
-                # Add count labels
-                for i, v in enumerate(counts):
-                    plt.text(v + 0.1, i, str(v), va='center')
-                
-                plt.tight_layout()
-                plt.show(block=False)
-                plt.pause(0.001)
+            self._render("tag_expenses", self._plot_tag_expenses, results)
                 
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         except Exception as e:
             print(f"Error generating report: {e}")
             
-    def generate_expenses_analytics(self, filters=None):
-        """Generate a dashboard with analytics for expenses using the same filtering logic as list_expenses"""
+    def _plot_tag_expenses(self, results):
+        """Horizontal bar chart of tag usage counts"""
+        import matplotlib.pyplot as plt
+        # Create figure with single plot
+        plt.figure(figsize=(10, 8))
+        
+        # Extract data for plotting
+        tags = [result[0] for result in results]
+        counts = [result[1] for result in results]
+        amounts = [result[2] for result in results]
+        
+        # Sort data by count for better visualization
+        sorted_data = sorted(zip(tags, counts, amounts), key=lambda x: x[1])
+        tags = [x[0] for x in sorted_data]
+        counts = [x[1] for x in sorted_data]
+        
+        # Bar chart for usage count
+        plt.barh(tags, counts, color='teal')
+        plt.xlabel('Usage Count')
+        plt.title('Tag Usage Frequency')
+        
+        # Add count labels
+        for i, v in enumerate(counts):
+            plt.text(v + 0.1, i, str(v), va='center')
+        
+        plt.tight_layout()
+
+    @pooled_reads
+    def generate_expenses_analytics(self, filters=None, in_sql=False):
+        """Generate a dashboard with analytics for expenses using the same filtering logic as list_expenses.
+        
+        With in_sql every panel is a GROUP BY query over the filter, so only aggregates are fetched
+        instead of every matching row.
+        """
+        import numpy as np
         try:
-            # Initial query to connect all required tables - EXACT SAME as list_expenses
-            query = """
-            SELECT e.expense_id, e.date, e.amount, e.description, 
-                c.category_name, t.tag_name, pm.payment_method_name, ue.username,
-                pme.payment_detail_identifier
-            FROM Expense e
-            LEFT JOIN category_expense ce ON e.expense_id = ce.expense_id
-            LEFT JOIN Categories c ON ce.category_id = c.category_id
-            LEFT JOIN tag_expense te ON e.expense_id = te.expense_id
-            LEFT JOIN Tags t ON te.tag_id = t.tag_id
-            LEFT JOIN payment_method_expense pme ON e.expense_id = pme.expense_id
-            LEFT JOIN Payment_Method pm ON pme.payment_method_id = pm.payment_method_id
-            LEFT JOIN user_expense ue ON e.expense_id = ue.expense_id
-            """
-            
-            params = []
-            
-            # Check if current user is admin or regular user - SAME as list_expenses
-            if self.privileges != "admin":
-                # Regular user can only see their own expenses
-                query += """
-                WHERE e.expense_id IN (
-                    SELECT expense_id FROM user_expense WHERE username = ?
-                )
-                """
-                params.append(self.current_user)
-            
-            # Define operation fields - SAME as list_expenses
-            op_fields = {"and": ["amount", "date"], 
-                        "or": ["category", "tag", "payment_method", "month"]}
-            
-            # Month name to number mapping - SAME as list_expenses
-            month_mapping = {
-                "january": "01", "february": "02", "march": "03", "april": "04",
-                "may": "05", "june": "06", "july": "07", "august": "08",
-                "september": "09", "october": "10", "november": "11", "december": "12"
-            }
-            
-            # Process filters - SAME LOGIC as list_expenses
-            if filters:
-                for field in filters:
-                    if not filters[field]:  # Skip empty filter lists
-                        continue
-                        
-                    if field in op_fields["and"]:
-                        op = "AND"
-                    else:
-                        op = "OR"
-                        
-                    # Special handling for month - SAME as list_expenses
-                    if field == "month":
-                        connector = "WHERE" if "WHERE" not in query else "AND"
-                        query += f" {connector} ("
-                        first = True
-                        for constraint in filters[field]:
-                            op_type, value = constraint
-                            if not first:
-                                query += f" {op} "
-                            first = False
-                            
-                            # Handle month name conversion
-                            if isinstance(value, str) and value.lower() in month_mapping:
-                                month_num = month_mapping[value.lower()]
-                                query += f"strftime('%m', e.date) {op_type} ?"
-                                params.append(month_num)
-                            else:
-                                # Assume it's a number
-                                query += f"strftime('%m', e.date) {op_type} ?"
-                                # Ensure month is zero-padded
-                                if isinstance(value, str) and len(value) == 1:
-                                    params.append(value.zfill(2))
-                                else:
-                                    params.append(value)
-                        query += ")"
-                        continue
-                        
-                    # Handle regular fields with mapping to actual DB columns - SAME as list_expenses
-                    field_mapping = {
-                        "amount": "e.amount",
-                        "date": "e.date",
-                        "category": "c.category_name",
-                        "tag": "t.tag_name",
-                        "payment_method": "pm.payment_method_name"
-                    }
-                    
-                    db_field = field_mapping.get(field, field)
-                    
-                    connector = "WHERE" if "WHERE" not in query else "AND"
-                    query += f" {connector} ("
-                    first = True
-                    for constraint in filters[field]:
-                        op_type, value = constraint
-                        if not first:
-                            query += f" {op} "
-                        first = False
-                        query += f"{db_field} {op_type} ?"
-                        params.append(value)
-                    query += ")"
-            
-            # Order by date descending - common practice in expense reports
-            query += " ORDER BY e.date DESC"
-            
-            # Execute the query and fetch results
-            self.cursor.execute(query, params)
-            expenses = self.cursor.fetchall()
+            # Regular users can only see their own expenses - SAME as list_expenses
+            where, params = compile_filters(filters or [], None if self.privileges == "admin" else self.current_user)
             
-            if not expenses:
+            if in_sql:
+                self.cursor.execute("SELECT COUNT(*), SUM(e.amount), MAX(e.amount), MIN(e.amount) FROM expense_fact e" + where, params)
+                count, total_amount, max_amount, min_amount = self.cursor.fetchone()
+            else:
+                # Same source and filters as list_expenses, only the columns the dashboard groups on
+                query = """
+                SELECT COALESCE(e.year, 0) * 100 + COALESCE(e.month, 0), e.amount,
+                    COALESCE(e.category_name, ''), COALESCE(e.tag_name, ''), COALESCE(e.payment_method_name, '')
+                FROM expense_fact e
+                """ + where
+                
+                # Execute the query and fetch results; everything below is aggregated, so no ORDER BY
+                self.cursor.execute(query, params)
+                expenses = self.cursor.fetchall()
+                count = len(expenses)
+                if count:
+                    # Columns of the result as arrays; the groupings below work on these
+                    columns = np.array(expenses, dtype=object)
+                    amounts = columns[:, 1].astype(np.float64)
+                    total_amount = float(amounts.sum())
+                    max_amount = float(amounts.max())
+                    min_amount = float(amounts.min())
+            
+            if not count:
                 print("No expenses found matching the criteria.")
                 return
             
             # Display summary information
-            total_amount = sum(expense[2] for expense in expenses)
-            avg_amount = total_amount / len(expenses)
-            max_amount = max(expense[2] for expense in expenses)
-            min_amount = min(expense[2] for expense in expenses)
+            avg_amount = total_amount / count
             
             print("\nExpense Analytics Dashboard")
             print("-" * 80)
-            print(f"Total expenses found: {len(expenses)}")
+            print(f"Total expenses found: {count}")
             print(f"Total amount: ${total_amount:.2f}")
             print(f"Average amount: ${avg_amount:.2f}")
             print(f"Maximum amount: ${max_amount:.2f}")
             print(f"Minimum amount: ${min_amount:.2f}")
             print("-" * 80)
             
+            # Filters on the rollup's own columns let the monthly panels come from it
+            from_rollup = all(group.field in ROLLUP_FIELDS for group in filters or [])
+            if from_rollup:
+                self.cursor.execute(
+                    "SELECT e.year, e.month, SUM(e.total_amount) FROM expense_monthly e" + where + " GROUP BY e.year, e.month",
+                    params)
+                month_totals = self.cursor.fetchall()
+            elif in_sql:
+                self.cursor.execute(
+                    "SELECT e.year, e.month, SUM(e.amount) FROM expense_fact e" + where + " GROUP BY e.year, e.month",
+                    params)
+                month_totals = self.cursor.fetchall()
+            else:
+                year_months, codes = np.unique(columns[:, 0].astype(np.int64), return_inverse=True)
+                month_totals = [(*divmod(year_month, 100), amount)
+                                for year_month, amount in zip(year_months.tolist(), np.bincount(codes, weights=amounts).tolist())]
+            
             # Prepare data for visualizations
-            categories = {}
-            payment_methods = {}
-            tags = {}
             dates = {}
             months = {}
-            
-            for expense in expenses:
-                expense_id, date, amount, description, category, tag, payment_method, username, payment_detail = expense
-                
-                # Group by date (for time series)
-                year_month = date[:7]  # Extract YYYY-MM
-                if year_month not in dates:
-                    dates[year_month] = 0
-                dates[year_month] += amount
-                
-                # Also group by month name for month-based analysis
-                month_num = date[5:7]  # Extract MM
-                month_name = next((k for k, v in month_mapping.items() if v == month_num), month_num)
-                if month_name not in months:
-                    months[month_name] = 0
-                months[month_name] += amount
-                
-                # Group by category
-                if category:
-                    if category not in categories:
-                        categories[category] = {"count": 0, "total": 0}
-                    categories[category]["count"] += 1
-                    categories[category]["total"] += amount
-                
-                # Group by payment method
-                if payment_method:
-                    if payment_method not in payment_methods:
-                        payment_methods[payment_method] = {"count": 0, "total": 0}
-                    payment_methods[payment_method]["count"] += 1
-                    payment_methods[payment_method]["total"] += amount
-                
-                # Group by tag
-                if tag:
-                    if tag not in tags:
-                        tags[tag] = {"count": 0, "total": 0}
-                    tags[tag]["count"] += 1
-                    tags[tag]["total"] += amount
-            
-            # Create visualizations
-            import matplotlib.pyplot as plt
-            from matplotlib.gridspec import GridSpec
-            import numpy as np
-            from matplotlib.ticker import FuncFormatter
-            
-            # Create figure with six panels using GridSpec for flexible layout
-            fig = plt.figure(figsize=(15, 12))
-            gs = GridSpec(3, 6, figure=fig)
-            
-            plt.suptitle('Expense Analytics Dashboard', fontsize=16, fontweight='bold')
-            
-            # 1. Key Metrics Panel
-            ax_metrics = fig.add_subplot(gs[0, :2])
-            ax_metrics.axis('off')
-            
-            # Add a styled metrics panel with key statistics
-            metrics_text = (
-                f"EXPENSE SUMMARY\n\n"
-                f"Total: ${total_amount:.2f}\n"
-                f"Average: ${avg_amount:.2f}\n"
-                f"Maximum: ${max_amount:.2f}\n"
-                f"Minimum: ${min_amount:.2f}\n"
-                f"Count: {len(expenses)}\n"
-            )
-            
-            ax_metrics.text(0.5, 0.5, metrics_text, 
-                        ha='center', va='center', 
-                        fontsize=12,
-                        bbox=dict(boxstyle="round,pad=0.5", 
-                                    facecolor='lightblue', 
-                                    alpha=0.3))
-            
-            # 2. Spending Time Series
-            ax_time = fig.add_subplot(gs[0, 2:])
-            
-            # Sort dates for time series
-            sorted_dates = sorted(dates.keys())
-            amounts_by_date = [dates[date] for date in sorted_dates]
-            
-            # Plot time series
-            ax_time.plot(sorted_dates, amounts_by_date, marker='o', linewidth=2, color='blue')
-            ax_time.set_title('Spending Over Time')
-            ax_time.set_xlabel('Month')
-            ax_time.set_ylabel('Amount ($)')
-            ax_time.tick_params(axis='x', rotation=45)
-            ax_time.grid(True, linestyle='--', alpha=0.7)
-            
-            # Format y-axis as currency
-            ax_time.yaxis.set_major_formatter(FuncFormatter(lambda x, _: f'${x:.0f}'))
-            
-            # 3. Category Breakdown - Pie Chart
-            ax_cat_pie = fig.add_subplot(gs[1, :3])
-            
-            if categories:
-                cat_names = list(categories.keys())
-                cat_totals = [categories[cat]["total"] for cat in cat_names]
-                
-                # Create pie chart
-                wedges, texts, autotexts = ax_cat_pie.pie(
-                    cat_totals, 
-                    labels=cat_names,
-                    autopct='%1.1f%%',
-                    startangle=90,
-                    wedgeprops={'edgecolor': 'w', 'linewidth': 1}
-                )
-                
-                # Style the percentage text
-                for autotext in autotexts:
-                    autotext.set_fontsize(9)
-                    autotext.set_fontweight('bold')
-                    
-                ax_cat_pie.set_title('Spending by Category')
-                ax_cat_pie.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
+            for year, month, amount in month_totals:
+                dates[f"{year or 0:04d}-{month or 0:02d}"] = amount
+                month_name = MONTH_NAMES.get(month, f"{month or 0:02d}")
+                months[month_name] = months.get(month_name, 0) + amount
+            
+            if in_sql:
+                categories = self._sql_group_by("category_name", where, params, from_rollup)
+                tags = self._sql_group_by("tag_name", where, params, from_rollup)
+                payment_methods = self._sql_group_by("payment_method_name", where, params, from_rollup)
+                histogram = self._sql_histogram(where, params, min_amount, max_amount)
             else:
-                ax_cat_pie.text(0.5, 0.5, "No category data available", ha='center', va='center')
-                ax_cat_pie.axis('off')
-            
-            # 4. Monthly Spending - Bar Chart
-            ax_monthly = fig.add_subplot(gs[1, 3:])
-            
-            if months:
-                # Sort months by calendar order
-                month_order = ["january", "february", "march", "april", "may", "june", 
-                            "july", "august", "september", "october", "november", "december"]
-                # Filter to only include months that are in our data
-                sorted_months = [m for m in month_order if m in months]
-                month_amounts = [months[m] for m in sorted_months]
-                
-                # Create bar chart
-                bars = ax_monthly.bar(sorted_months, month_amounts, color='skyblue')
-                ax_monthly.set_title('Monthly Spending')
-                ax_monthly.set_xlabel('Month')
-                ax_monthly.set_ylabel('Amount ($)')
-                ax_monthly.tick_params(axis='x', rotation=45)
-                
-                # Format y-axis as currency
-                ax_monthly.yaxis.set_major_formatter(FuncFormatter(lambda x, _: f'${x:.0f}'))
-                
-                # Add amount labels to bars
-                for bar in bars:
-                    height = bar.get_height()
-                    ax_monthly.annotate(f'${height:.0f}',
-                                    xy=(bar.get_x() + bar.get_width() / 2, height),
-                                    xytext=(0, 3),
-                                    textcoords="offset points",
-                                    ha='center', va='bottom',
-                                    rotation=45)
-            else:
-                ax_monthly.text(0.5, 0.5, "No monthly data available", ha='center', va='center')
-                ax_monthly.axis('off')
-            
-            # 5. Amount Distribution - Histogram
-            ax_hist = fig.add_subplot(gs[2, :3])
-            
-            amounts = [expense[2] for expense in expenses]
-            
-            # Create histogram with appropriate bins
-            bins = min(20, len(set(amounts)))
-            ax_hist.hist(amounts, bins=bins, alpha=0.7, color='lightgreen', edgecolor='black')
-            ax_hist.set_title('Amount Distribution')
-            ax_hist.set_xlabel('Amount ($)')
-            ax_hist.set_ylabel('Frequency')
-            
-            # Add a vertical line for the average
-            ax_hist.axvline(avg_amount, color='red', linestyle='dashed', linewidth=1)
-            ax_hist.text(
-                avg_amount, 
-                ax_hist.get_ylim()[1] * 0.9, 
-                f'Avg: ${avg_amount:.2f}', 
-                color='red',
-                ha='center', 
-                va='center',
-                bbox=dict(facecolor='white', alpha=0.8, edgecolor='none')
-            )
-            
-            # 6. Payment Method Distribution
-            ax_payment = fig.add_subplot(gs[2, 3:])
-            
-            if payment_methods:
-                # Sort payment methods by count
-                sorted_methods = sorted(payment_methods.items(), key=lambda x: x[1]["count"], reverse=True)
-                
-                method_names = [method[0] for method in sorted_methods]
-                method_counts = [method[1]["count"] for method in sorted_methods]
-                
-                # Create horizontal bar chart with colorful bars
-                colors = plt.cm.viridis(np.linspace(0.2, 0.8, len(method_names)))
-                bars = ax_payment.barh(method_names, method_counts, color=colors)
-                
-                ax_payment.set_title('Payment Method Usage')
-                ax_payment.set_xlabel('Number of Expenses')
-                
-                # Add count labels to bars
-                for i, bar in enumerate(bars):
-                    width = bar.get_width()
-                    ax_payment.text(
-                        width + 0.3, 
-                        bar.get_y() + bar.get_height()/2, 
-                        f'{width:.0f}',
-                        ha='left', 
-                        va='center',
-                        fontweight='bold'
-                    )
-            else:
-                ax_payment.text(0.5, 0.5, "No payment method data available", ha='center', va='center')
-                ax_payment.axis('off')
-            
-            plt.tight_layout()
-            plt.subplots_adjust(top=0.93)  # Adjust for main title
+                categories = self._group_by(columns[:, 2], amounts)
+                tags = self._group_by(columns[:, 3], amounts)
+                payment_methods = self._group_by(columns[:, 4], amounts)
+                histogram = np.histogram(amounts, bins=min(20, len(np.unique(amounts))))
             
-            plt.show(block=False)
-            plt.pause(0.001)
+            # Create visualizations
+            self._render("expenses_analytics", self._plot_expenses_analytics, count, total_amount, avg_amount, max_amount, min_amount, dates, months, categories, payment_methods, tags, histogram)
             
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         except Exception as e:
-            print(f"Error generating analytics dashboard: {e}")
\ No newline at end of file
+            print(f"Error generating analytics dashboard: {e}")
+
+    @staticmethod
+    def _group_by(keys, amounts):
+        """Count and total of amounts per non-empty key, in order of first appearance"""
+        import numpy as np
+        # Factorize in one pass: each key's code is its position in index
+        index = {}
+        codes = np.fromiter((index.setdefault(key, len(index)) for key in keys), np.intp, len(keys))
+        counts = np.bincount(codes, minlength=len(index))
+        totals = np.bincount(codes, weights=amounts, minlength=len(index))
+        return {key: {"count": int(counts[code]), "total": float(totals[code])} for key, code in index.items() if key}
+
+    def _sql_group_by(self, column, where, params, from_rollup=False):
+        """Count and total of amounts per non-empty value of column, from one GROUP BY query"""
+        if from_rollup:
+            query = f"SELECT e.{column}, SUM(e.expense_count), SUM(e.total_amount) FROM expense_monthly e{where} GROUP BY e.{column}"
+        else:
+            query = f"SELECT e.{column}, COUNT(*), SUM(e.amount) FROM expense_fact e{where} GROUP BY e.{column}"
+        self.cursor.execute(query, params)
+        return {key: {"count": count, "total": total} for key, count, total in self.cursor.fetchall() if key}
+
+    def _sql_histogram(self, where, params, min_amount, max_amount, bins=20):
+        """Counts of amounts in equal-width buckets between min_amount and max_amount, with the bucket edges"""
+        import numpy as np
+        if max_amount == min_amount:
+            bins, min_amount, max_amount = 1, min_amount - 0.5, max_amount + 0.5
+        width = (max_amount - min_amount) / bins
+        self.cursor.execute(
+            "SELECT MIN(CAST((e.amount - ?) / ? AS INTEGER), ?), COUNT(*) FROM expense_fact e" + where + " GROUP BY 1",
+            (min_amount, width, bins - 1, *params))
+        counts = np.zeros(bins, dtype=np.int64)
+        for bucket, count in self.cursor.fetchall():
+            counts[bucket] = count
+        return counts, np.linspace(min_amount, max_amount, bins + 1)
+
+    def _plot_expenses_analytics(self, count, total_amount, avg_amount, max_amount, min_amount, dates, months, categories, payment_methods, tags, histogram):
+        """Six-panel analytics dashboard"""
+        import matplotlib.pyplot as plt
+        from matplotlib.gridspec import GridSpec
+        import numpy as np
+        from matplotlib.ticker import FuncFormatter
+        
+        # Create figure with six panels using GridSpec for flexible layout
+        fig = plt.figure(figsize=(15, 12))
+        gs = GridSpec(3, 6, figure=fig)
+        
+        plt.suptitle('Expense Analytics Dashboard', fontsize=16, fontweight='bold')
+        
+        # 1. Key Metrics Panel
+        ax_metrics = fig.add_subplot(gs[0, :2])
+        ax_metrics.axis('off')
+        
+        # Add a styled metrics panel with key statistics
+        metrics_text = (
+            f"EXPENSE SUMMARY\n\n"
+            f"Total: ${total_amount:.2f}\n"
+            f"Average: ${avg_amount:.2f}\n"
+            f"Maximum: ${max_amount:.2f}\n"
+            f"Minimum: ${min_amount:.2f}\n"
+            f"Count: {count}\n"
+        )
+        
+        ax_metrics.text(0.5, 0.5, metrics_text, 
+                    ha='center', va='center', 
+                    fontsize=12,
+                    bbox=dict(boxstyle="round,pad=0.5", 
+                                facecolor='lightblue', 
+                                alpha=0.3))
+        
+        # 2. Spending Time Series
+        ax_time = fig.add_subplot(gs[0, 2:])
+        
+        # Sort dates for time series
+        sorted_dates = sorted(dates.keys())
+        amounts_by_date = [dates[date] for date in sorted_dates]
+        
+        # Plot time series
+        ax_time.plot(sorted_dates, amounts_by_date, marker='o', linewidth=2, color='blue')
+        ax_time.set_title('Spending Over Time')
+        ax_time.set_xlabel('Month')
+        ax_time.set_ylabel('Amount ($)')
+        ax_time.tick_params(axis='x', rotation=45)
+        ax_time.grid(True, linestyle='--', alpha=0.7)
+        
+        # Format y-axis as currency
+        ax_time.yaxis.set_major_formatter(FuncFormatter(lambda x, _: f'${x:.0f}'))
+        
+        # 3. Category Breakdown - Pie Chart
+        ax_cat_pie = fig.add_subplot(gs[1, :3])
+        
+        if categories:
+            cat_names = list(categories.keys())
+            cat_totals = [categories[cat]["total"] for cat in cat_names]
+        
+            # Create pie chart
+            wedges, texts, autotexts = ax_cat_pie.pie(
+                cat_totals, 
+                labels=cat_names,
+                autopct='%1.1f%%',
+                startangle=90,
+                wedgeprops={'edgecolor': 'w', 'linewidth': 1}
+            )
+        
+            # Style the percentage text
+            for autotext in autotexts:
+                autotext.set_fontsize(9)
+                autotext.set_fontweight('bold')
+        
+            ax_cat_pie.set_title('Spending by Category')
+            ax_cat_pie.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
+        else:
+            ax_cat_pie.text(0.5, 0.5, "No category data available", ha='center', va='center')
+            ax_cat_pie.axis('off')
+        
+        # 4. Monthly Spending - Bar Chart
+        ax_monthly = fig.add_subplot(gs[1, 3:])
+        
+        if months:
+            # Sort months by calendar order
+            month_order = ["january", "february", "march", "april", "may", "june", 
+                        "july", "august", "september", "october", "november", "december"]
+            # Filter to only include months that are in our data
+            sorted_months = [m for m in month_order if m in months]
+            month_amounts = [months[m] for m in sorted_months]
+        
+            # Create bar chart
+            bars = ax_monthly.bar(sorted_months, month_amounts, color='skyblue')
+            ax_monthly.set_title('Monthly Spending')
+            ax_monthly.set_xlabel('Month')
+            ax_monthly.set_ylabel('Amount ($)')
+            ax_monthly.tick_params(axis='x', rotation=45)
+        
+            # Format y-axis as currency
+            ax_monthly.yaxis.set_major_formatter(FuncFormatter(lambda x, _: f'${x:.0f}'))
+        
+            # Add amount labels to bars
+            for bar in bars:
+                height = bar.get_height()
+                ax_monthly.annotate(f'${height:.0f}',
+                                xy=(bar.get_x() + bar.get_width() / 2, height),
+                                xytext=(0, 3),
+                                textcoords="offset points",
+                                ha='center', va='bottom',
+                                rotation=45)
+        else:
+            ax_monthly.text(0.5, 0.5, "No monthly data available", ha='center', va='center')
+            ax_monthly.axis('off')
+        
+        # 5. Amount Distribution - Histogram
+        ax_hist = fig.add_subplot(gs[2, :3])
+        
+        # Draw the histogram from its precomputed bucket counts and edges
+        bucket_counts, edges = histogram
+        ax_hist.hist(edges[:-1], bins=edges, weights=bucket_counts, alpha=0.7, color='lightgreen', edgecolor='black')
+        ax_hist.set_title('Amount Distribution')
+        ax_hist.set_xlabel('Amount ($)')
+        ax_hist.set_ylabel('Frequency')
+        
+        # Add a vertical line for the average
+        ax_hist.axvline(avg_amount, color='red', linestyle='dashed', linewidth=1)
+        ax_hist.text(
+            avg_amount, 
+            ax_hist.get_ylim()[1] * 0.9, 
+            f'Avg: ${avg_amount:.2f}', 
+            color='red',
+            ha='center', 
+            va='center',
+            bbox=dict(facecolor='white', alpha=0.8, edgecolor='none')
+        )
+        
+        # 6. Payment Method Distribution
+        ax_payment = fig.add_subplot(gs[2, 3:])
+        
+        if payment_methods:
+            # Sort payment methods by count
+            sorted_methods = sorted(payment_methods.items(), key=lambda x: x[1]["count"], reverse=True)
+        
+            method_names = [method[0] for method in sorted_methods]
+            method_counts = [method[1]["count"] for method in sorted_methods]
+        
+            # Create horizontal bar chart with colorful bars
+            colors = plt.cm.viridis(np.linspace(0.2, 0.8, len(method_names)))
+            bars = ax_payment.barh(method_names, method_counts, color=colors)
+        
+            ax_payment.set_title('Payment Method Usage')
+            ax_payment.set_xlabel('Number of Expenses')
+        
+            # Add count labels to bars
+            for i, bar in enumerate(bars):
+                width = bar.get_width()
+                ax_payment.text(
+                    width + 0.3, 
+                    bar.get_y() + bar.get_height()/2, 
+                    f'{width:.0f}',
+                    ha='left', 
+                    va='center',
+                    fontweight='bold'
+                )
+        else:
+            ax_payment.text(0.5, 0.5, "No payment method data available", ha='center', va='center')
+            ax_payment.axis('off')
+        
+        plt.tight_layout()
+        plt.subplots_adjust(top=0.93)  # Adjust for main title
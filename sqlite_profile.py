@@ -0,0 +1,83 @@
+import os
+
+# Pragmas applied when the connection opens, in this order. journal_mode is first because
+# it cannot change inside a transaction. Negative cache_size is in KiB, mmap_size in bytes.
+PROFILES = {
+    # SQLite's own defaults: rollback journal, fsync on every commit, 2 MB page cache
+    "safe": {
+        "journal_mode": "delete",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000
+    },
+    # WAL only syncs at checkpoints with NORMAL; a power cut can lose the last commits but never corrupts
+    "balanced": {
+        "journal_mode": "wal",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000
+    },
+    # For large imports: no syncs at all, so a crash of the OS may corrupt the file
+    "bulk": {
+        "journal_mode": "wal",
+        "synchronous": "OFF",
+        "cache_size": -262144,
+        "mmap_size": 1073741824,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000
+    }
+}
+DEFAULT_PROFILE = "balanced"
+PROFILE_ENV = "EXPENSE_DB_PROFILE"
+
+# PRAGMA reports these settings as numbers
+PRAGMA_NAMES = {
+    "synchronous": {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"},
+    "temp_store": {0: "DEFAULT", 1: "FILE", 2: "MEMORY"}
+}
+
+
+def profile_name(name=None):
+    """The profile to use: `name`, else $EXPENSE_DB_PROFILE, else DEFAULT_PROFILE"""
+    name = (name or os.environ.get(PROFILE_ENV) or DEFAULT_PROFILE).lower()
+    if name not in PROFILES:
+        raise ValueError(f"Unknown performance profile '{name}'. Choose from {', '.join(PROFILES)}.")
+    return name
+
+
+def apply_profile(cursor, name, read_only=False):
+    """Set the pragmas of profile `name` on the connection behind `cursor`.
+
+    A read-only connection cannot change the journal mode, which the writer sets for the file.
+    """
+    for pragma, value in PROFILES[name].items():
+        if read_only and pragma == "journal_mode":
+            continue
+        cursor.execute(f"PRAGMA {pragma} = {value}")
+        cursor.fetchall()
+
+
+def current_pragmas(cursor):
+    """The profile's pragmas as the connection reports them, by their names in PROFILES"""
+    settings = {}
+    for pragma in PROFILES[DEFAULT_PROFILE]:
+        cursor.execute(f"PRAGMA {pragma}")
+        value = cursor.fetchone()[0]
+        settings[pragma] = PRAGMA_NAMES.get(pragma, {}).get(value, value)
+    return settings
+
+
+def show_pragmas(cursor):
+    """Print the pragmas in effect and which profile, if any, they match"""
+    settings = current_pragmas(cursor)
+    matching = next((name for name, profile in PROFILES.items() if profile == settings), None)
+
+    print(f"\nPerformance profile: {matching or 'custom'}")
+    print("-" * 40)
+    for pragma, value in settings.items():
+        print(f"{pragma:<15} {value}")
+    print("-" * 40)
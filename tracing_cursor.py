@@ -0,0 +1,100 @@
+import sqlite3
+import textwrap
+import time
+
+
+class TracingCursor:
+    """Cursor wrapper that records every statement run through it.
+
+    Each execute() or executemany() starts a new entry holding the SQL, its parameters
+    and the time spent executing; fetches are timed against the statement they read
+    from. Anything else, such as lastrowid, is passed through to the wrapped cursor.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.statements = []
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def wrap(self, cursor):
+        """A tracer over another cursor that records into this one's statements"""
+        tracer = TracingCursor(cursor)
+        tracer.statements = self.statements
+        return tracer
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        return result, time.perf_counter() - start
+
+    def _fetched(self, rows, elapsed):
+        # Fetches belong to the statement executed last
+        if self.statements:
+            self.statements[-1]["fetch"] += elapsed
+            self.statements[-1]["rows"] += rows
+
+    def execute(self, sql, params=()):
+        self.statements.append({"sql": sql, "params": params, "batch": False, "execute": 0.0, "fetch": 0.0, "rows": 0})
+        _, self.statements[-1]["execute"] = self._timed(self.cursor.execute, sql, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        self.statements.append({"sql": sql, "params": seq_of_params, "batch": True, "execute": 0.0, "fetch": 0.0, "rows": 0})
+        _, self.statements[-1]["execute"] = self._timed(self.cursor.executemany, sql, seq_of_params)
+        return self
+
+    def fetchone(self):
+        row, elapsed = self._timed(self.cursor.fetchone)
+        self._fetched(0 if row is None else 1, elapsed)
+        return row
+
+    def fetchmany(self, size=None):
+        rows, elapsed = self._timed(self.cursor.fetchmany, size or self.cursor.arraysize)
+        self._fetched(len(rows), elapsed)
+        return rows
+
+    def fetchall(self):
+        rows, elapsed = self._timed(self.cursor.fetchall)
+        self._fetched(len(rows), elapsed)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def report(self, wall_time):
+        """Print each statement with its parameters, query plan and timings, then the totals"""
+        plan_cursor = self.cursor.connection.cursor()
+        execute_total = 0.0
+        fetch_total = 0.0
+
+        for number, statement in enumerate(self.statements, 1):
+            execute_total += statement["execute"]
+            fetch_total += statement["fetch"]
+            params = statement["params"]
+
+            print(f"\nQuery {number}: execute {statement['execute']:.4f}s | fetch {statement['fetch']:.4f}s | {statement['rows']} row(s)")
+            print(textwrap.indent(textwrap.dedent(statement["sql"]).strip(), "    "))
+            if statement["batch"]:
+                print(f"  Parameters: {len(params)} set(s), first {list(params[0]) if params else []}")
+            else:
+                print(f"  Parameters: {list(params)}")
+
+            try:
+                plan_cursor.execute("EXPLAIN QUERY PLAN " + statement["sql"], params[0] if statement["batch"] and params else params)
+                plan = plan_cursor.fetchall()
+            except sqlite3.Error as e:
+                print(f"  Plan: unavailable ({e})")
+                continue
+            if plan:
+                print("  Plan:")
+                depth = {0: 0}
+                for node_id, parent_id, _, detail in plan:
+                    depth[node_id] = depth.get(parent_id, 0) + 1
+                    print("    " + "  " * (depth[node_id] - 1) + detail)
+
+        render_total = max(0.0, wall_time - execute_total - fetch_total)
+        print(f"\nTotal: {len(self.statements)} statement(s) | execute {execute_total:.4f}s | fetch {fetch_total:.4f}s | "
+              f"render {render_total:.4f}s | wall {wall_time:.4f}s")